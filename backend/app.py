@@ -1,22 +1,39 @@
-import asyncio
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
-from db import initialize_client, fetch_collection_data
+from db import get_db, fetch_collection_data
 from werkzeug.utils import secure_filename
-from helpers.videoProcessor import VideoTranscriptionTranslator
+from helpers import eventLoop as event_loop
+from helpers import telemetry
+from helpers.clients import get_provider_policy, get_translator, warm_up
+from helpers.translationCache import translation_cache
+from helpers.blogCache import blog_cache
+from helpers.jobQueue import JobQueue
+from helpers.uploadStore import UploadError, UploadStore
+from pipeline import (
+    translate_and_store,
+    translate_and_store_async,
+    translate_batch_and_store,
+    stream_translate_and_store,
+    score_and_store,
+    transcribe_video_file,
+)
 from dotenv import load_dotenv
 import bcrypt
+import json
 import os
 import jwt
 import datetime
+import time
 import uuid
-from blog import insert_blog, get_user_blog, get_blog, update_blog
+from blog import insert_blog, get_user_blog, get_blog, get_blog_by_url, update_blog, label_blog
 
 load_dotenv()
 ALLOWED_EXTENSIONS = set(["mp4", "mov"])
 UPLOAD_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), "temp"))
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+METRICS_MODE = os.getenv("METRICS_MODE", "sync")
+EVALUATION_PROFILE = os.getenv("EVALUATION_PROFILE", "full")
 app = Flask(__name__)
 CORS(app)
 
@@ -24,7 +41,13 @@ app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 500 * 1000 * 1000  # 500 MB
 app.config["CORS_HEADER"] = "application/json"
 
-db = initialize_client()
+db = get_db()
+job_queue = JobQueue.from_env()
+upload_store = UploadStore(
+    os.path.join(UPLOAD_FOLDER, "uploads"),
+    max_bytes=app.config["MAX_CONTENT_LENGTH"],
+    expiry_seconds=int(os.getenv("UPLOAD_EXPIRY_SECONDS", "86400")),
+)
 
 INDIAN_LANGUAGES = {
     "Hindi": "hi",
@@ -44,6 +67,121 @@ def allowedFile(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def isAsyncRequest():
+    return request.values.get("async", "").lower() == "true"
+
+
+def requiredLanguages():
+    return {
+        language.strip(): INDIAN_LANGUAGES[language.strip()]
+        for language in request.form.get("required_languages").split(",")
+    }
+
+
+def evaluationProfile(value=None):
+    """
+    The requested evaluation profile, or None if the translator has no such
+    profile
+    """
+    profile = value or request.values.get("evaluationProfile") or EVALUATION_PROFILE
+    return profile if profile in get_translator().EVALUATION_PROFILES else None
+
+
+def unknownEvaluationProfile():
+    profiles = ", ".join(get_translator().EVALUATION_PROFILES)
+    return jsonify({"error": f"evaluationProfile must be one of: {profiles}"}), 400
+
+
+def enqueueScoring(payload):
+    return job_queue.submit("score-translations", payload)
+
+
+def enqueueLabeling(email, blog_id):
+    return job_queue.submit("classify-blog-labels", {"email": email, "blog_id": blog_id})
+
+
+@job_queue.register("process-data", stages=["translation", "storage"])
+def processDataJob(job):
+    translator = get_translator()
+    payload = job.payload
+    return translate_and_store(
+        db,
+        translator,
+        payload["content"],
+        payload["email"],
+        payload["isVideo"],
+        payload["required_languages"],
+        job=job,
+        score_mode=payload.get("scoreMode", "sync"),
+        enqueue_scoring=enqueueScoring,
+        evaluation=payload.get("evaluationProfile", "full"),
+    )
+
+
+@job_queue.register("score-translations", stages=["evaluation", "storage"])
+def scoreTranslationsJob(job):
+    translator = get_translator()
+    return score_and_store(db, translator, job.payload, job=job)
+
+
+@job_queue.register("classify-blog-labels", stages=["classification", "storage"])
+def classifyBlogLabelsJob(job):
+    return label_blog(job.payload["email"], job.payload["blog_id"], job=job)
+
+
+@job_queue.register("transcribe-video", stages=["transcription"])
+def transcribeVideoJob(job):
+    translator = get_translator()
+    transcript = ""
+    for video_path in job.payload["video_paths"]:
+        transcript = transcribe_video_file(translator, video_path, job=job)
+    return {"data": transcript, "status": "successful in generating transcript"}
+
+
+# Embedded workers run queued jobs inside the web process; set
+# JOB_EMBEDDED_WORKERS=0 and run `python worker.py` to scale them separately
+job_queue.start_workers(int(os.getenv("JOB_EMBEDDED_WORKERS", "2")))
+
+# Build the shared provider clients in the background at worker boot
+if os.getenv("WARMUP_CLIENTS", "true").lower() == "true":
+    warm_up()
+
+
+@app.before_request
+def startTrace():
+    telemetry.start_trace(f"{request.method} {request.path}")
+
+
+@app.after_request
+def recordRequest(response):
+    trace = telemetry.current_trace()
+    if trace is not None:
+        telemetry.HTTP_SECONDS.observe(
+            time.perf_counter() - trace.started,
+            method=request.method,
+            endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+            status=str(response.status_code),
+        )
+        # Per-stage totals, so a slow request shows where its time went
+        timing = telemetry.server_timing(trace)
+        if timing:
+            response.headers["Server-Timing"] = timing
+        response.headers["X-Trace-Id"] = trace.id
+    return response
+
+
+@app.teardown_request
+def endTrace(error=None):
+    trace = telemetry.current_trace()
+    if trace is not None:
+        telemetry.end_trace(trace, method=request.method, path=request.path)
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(telemetry.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/health")
 def health():
     return f"Yes healthy {os.getenv('SAMPLE')}!"
@@ -55,72 +193,143 @@ def processData():
         isVideo = request.form.get("isVideo")
         content = request.form.get("content")
         email = request.form.get("email")
+        # "deferred" returns translations right away and scores them later
+        scoreMode = request.form.get("scoreMode", METRICS_MODE)
+        evaluation = evaluationProfile()
+        if evaluation is None:
+            return unknownEvaluationProfile()
 
-        required_languages = {}
-        required_languages_list = [
-            item.strip() for item in request.form.get("required_languages").split(",")
-        ]
-        for i in required_languages_list:
-            required_languages[i] = INDIAN_LANGUAGES[i]
-
-        translator = VideoTranscriptionTranslator(GOOGLE_API_KEY)
-        # check is the user inputted a text content/file
-        final_resp = {}
-        rawInputId = str(uuid.uuid4())
-        raw_input = db["raw_input"]
-
-        translate = db["translate"]
-        results = asyncio.run(
-            translator.translate_text_transcript(required_languages, content)
-        )
-        final_resp["original_transcript"] = results["original_transcript"]
+        required_languages = requiredLanguages()
 
-        raw_input.insert_one(
-            {
-                "id": rawInputId,
-                "useremail": email,
-                "content": content,
-                "type": "video" if isVideo == "true" else "text",
-            }
-        )
-        allTranslationIds = []
-        for language, data in results["translations"].items():
-            print(f"\n{language}:")
-            translateId = str(uuid.uuid4())
-            final_resp[language] = [
-                data["gemini_translation"],
-                data["metrics"]["bleu"],
-                data["metrics"]["rouge1"],
-                data["metrics"]["rouge2"],
-                data["metrics"]["rougeL"],
-                data["metrics"]["cosine_similarity_with_ground_truth"],
-            ]
-            translate.insert_one(
+        if isAsyncRequest():
+            jobId = job_queue.submit(
+                "process-data",
                 {
-                    "id": translateId,
-                    "inpid": rawInputId,
-                    "lang": language,
-                    "content": data["gemini_translation"],
-                    "bleuscore": data["metrics"]["bleu"],
-                    "rouge1": data["metrics"]["rouge1"],
-                    "rouge2": data["metrics"]["rouge2"],
-                    "rougel": data["metrics"]["rougeL"],
-                    "cosinesimilarity": data["metrics"][
-                        "cosine_similarity_with_ground_truth"
-                    ],
-                }
+                    "content": content,
+                    "email": email,
+                    "isVideo": isVideo == "true",
+                    "required_languages": required_languages,
+                    "scoreMode": scoreMode,
+                    "evaluationProfile": evaluation,
+                },
             )
-            allTranslationIds.append(translateId)
+            return jsonify({"status": "queued", "jobId": jobId}), 202
 
+        translator = get_translator()
+        # The form, translator and job queue are handled on this request
+        # thread, so only the pipeline itself runs on the shared event loop
+        # check is the user inputted a text content/file
         return jsonify(
-            {
-                "data": final_resp,
-                "status": "success",
-                "rawInputId": rawInputId,
-                "translateId": allTranslationIds,
-            }
+            event_loop.run(
+                translate_and_store_async(
+                    db,
+                    translator,
+                    content,
+                    email,
+                    isVideo == "true",
+                    required_languages,
+                    score_mode=scoreMode,
+                    enqueue_scoring=enqueueScoring,
+                    evaluation=evaluation,
+                )
+            )
         )
 
+
+def sseEvent(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def ndjsonEvent(event):
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+@app.route("/process-data/stream", methods=["POST"])
+def processDataStream():
+    # Read the form before streaming, as the request is gone by then
+    content = request.form.get("content")
+    email = request.form.get("email")
+    isVideo = request.form.get("isVideo") == "true"
+    scoreMode = request.form.get("scoreMode", METRICS_MODE)
+    evaluation = evaluationProfile()
+    if evaluation is None:
+        return unknownEvaluationProfile()
+    required_languages = requiredLanguages()
+    ndjson = (
+        request.values.get("format") == "ndjson"
+        or request.accept_mimetypes.best == "application/x-ndjson"
+    )
+    translator = get_translator()
+
+    def events():
+        try:
+            yield from event_loop.iterate(
+                lambda: stream_translate_and_store(
+                    db,
+                    translator,
+                    content,
+                    email,
+                    isVideo,
+                    required_languages,
+                    score_mode=scoreMode,
+                    enqueue_scoring=enqueueScoring,
+                    evaluation=evaluation,
+                )
+            )
+        except Exception as e:
+            print(f"Error streaming translations: {e}")
+            yield {"event": "error", "message": str(e)}
+
+    format_event = ndjsonEvent if ndjson else sseEvent
+    return Response(
+        (format_event(event) for event in events()),
+        mimetype="application/x-ndjson" if ndjson else "text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/process-batch", methods=["POST"])
+def processBatch():
+    data = request.get_json()
+    email = data.get("email")
+    documents = [
+        document if isinstance(document, dict) else {"content": document}
+        for document in data.get("documents", [])
+    ]
+    languages = data.get("required_languages", [])
+    if isinstance(languages, str):
+        languages = [item.strip() for item in languages.split(",")]
+
+    if not documents or not languages:
+        return jsonify({"error": "documents and required_languages are required"}), 400
+    unknown = [language for language in languages if language not in INDIAN_LANGUAGES]
+    if unknown:
+        return jsonify({"error": f"Unsupported languages: {', '.join(unknown)}"}), 400
+    if not all(document.get("content") for document in documents):
+        return jsonify({"error": "every document needs a content"}), 400
+    evaluation = evaluationProfile(data.get("evaluationProfile"))
+    if evaluation is None:
+        return unknownEvaluationProfile()
+
+    results = translate_batch_and_store(
+        db,
+        get_translator(),
+        documents,
+        email,
+        {language: INDIAN_LANGUAGES[language] for language in languages},
+        store=data.get("store", True),
+        score=data.get("score", False),
+        enqueue_scoring=enqueueScoring,
+        evaluation=evaluation,
+    )
+    # One JSON document per line, streamed as each document completes
+    return Response(
+        (json.dumps(result, ensure_ascii=False) + "\n" for result in results),
+        mimetype="application/x-ndjson",
+    )
+
+
 @app.route("/transcribe-video", methods=["POST"])
 def transcribeVideo():
     if request.method == "POST":
@@ -128,39 +337,47 @@ def transcribeVideo():
         if not os.path.exists(app.config["UPLOAD_FOLDER"]):
             os.makedirs(app.config["UPLOAD_FOLDER"])
 
-        translator = VideoTranscriptionTranslator(GOOGLE_API_KEY)
         file = request.files.getlist("files")
         filename = ""
         print(request.files, "....")
         transcript = ""
-        
+
+        if isAsyncRequest():
+            if not all(allowedFile(secure_filename(f.filename)) for f in file):
+                return jsonify({"message": "File type not allowed"}), 400
+
+            video_paths = []
+            for f in file:
+                filename = secure_filename(f.filename)
+                # Queued files outlive the request, so give them unique names
+                video_path = os.path.join(
+                    app.config["UPLOAD_FOLDER"], f"{uuid.uuid4()}-{filename}"
+                )
+                f.save(video_path)
+                video_paths.append(video_path)
+
+            jobId = job_queue.submit("transcribe-video", {"video_paths": video_paths})
+            return jsonify({"status": "queued", "jobId": jobId}), 202
+
+        translator = get_translator()
         for f in file:
             print(f.filename)
             filename = secure_filename(f.filename)
             print(allowedFile(filename))
             if allowedFile(filename):
-                file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                f.save(file_path)
+                # Unique names keep concurrent uploads of the same file apart
+                video_path = os.path.join(
+                    app.config["UPLOAD_FOLDER"], f"{uuid.uuid4()}-{filename}"
+                )
+                f.save(video_path)
             else:
                 return jsonify({"message": "File type not allowed"}), 400
-                
-            video_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+
             print(video_path)
             try:
-                audio_path = translator.extract_audio(video_path)
-                transcript = translator.transcribe_audio(audio_path)
-
-                # Clean up files
-                os.remove(audio_path)
-                if os.path.exists(video_path):
-                    os.remove(video_path)
-                else:
-                    print(f"File {video_path} does not exist.")
+                transcript = transcribe_video_file(translator, video_path)
             except Exception as e:
                 print(f"An error occurred: {str(e)}")
-                # Clean up any remaining files even if there's an error
-                if os.path.exists(video_path):
-                    os.remove(video_path)
                 return jsonify({"status": f"error encountered - {e}"})
 
         return jsonify(
@@ -169,6 +386,66 @@ def transcribeVideo():
     else:
         return jsonify({"status": "Method not allowed"})
 
+@app.errorhandler(UploadError)
+def uploadError(e):
+    response = jsonify({"message": str(e), "offset": e.offset})
+    if e.offset is not None:
+        response.headers["Upload-Offset"] = str(e.offset)
+    return response, e.status
+
+
+def uploadResponse(status, code=200):
+    response = jsonify({"data": status, "status": "success"})
+    response.headers["Upload-Offset"] = str(status["offset"])
+    return response, code
+
+
+@app.route("/uploads", methods=["POST"])
+def createUpload():
+    data = request.get_json()
+    filename = secure_filename(data.get("filename") or "")
+    if not allowedFile(filename):
+        return jsonify({"message": "File type not allowed"}), 400
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return jsonify({"message": "size must be the file size in bytes"}), 400
+
+    uploadId = upload_store.create(filename, size)
+    response, code = uploadResponse(upload_store.status(uploadId), 201)
+    response.headers["Location"] = f"/uploads/{uploadId}"
+    return response, code
+
+
+@app.route("/uploads/<upload_id>", methods=["GET"])
+def getUpload(upload_id):
+    return uploadResponse(upload_store.status(upload_id))
+
+
+@app.route("/uploads/<upload_id>", methods=["PATCH"])
+def appendUpload(upload_id):
+    try:
+        offset = int(request.headers["Upload-Offset"])
+    except (KeyError, ValueError):
+        return jsonify({"message": "Upload-Offset header is required"}), 400
+
+    # The raw body is streamed to the spool file, never buffered in memory
+    status = upload_store.append(
+        upload_id,
+        offset,
+        request.stream,
+        on_complete=lambda path: job_queue.submit(
+            "transcribe-video", {"video_paths": [path]}
+        ),
+    )
+    return uploadResponse(status)
+
+
+@app.route("/uploads/<upload_id>", methods=["DELETE"])
+def deleteUpload(upload_id):
+    upload_store.delete(upload_id)
+    return "", 204
+
 # Route to insert a new user
 @app.route("/insert_user", methods=["POST"])
 def insert_user():
@@ -258,7 +535,7 @@ def login():
 
 @app.route('/insertBlog', methods=['POST'])
 def insertBlog():
-    return insert_blog(request)
+    return insert_blog(request, enqueue_labeling=enqueueLabeling)
 
 @app.route('/fetchUserBlogs', methods=['POST'])
 def fetchUserBlogs():
@@ -268,13 +545,17 @@ def fetchUserBlogs():
 def getBlog():
     return get_blog(request)
 
+@app.route("/blogs/<url>", methods=["GET"])
+def getBlogByUrl(url):
+    return get_blog_by_url(request, url)
+
 @app.route("/updateBlog", methods=["POST"])
 def editBlog():
-    return update_blog(request)
+    return update_blog(request, enqueue_labeling=enqueueLabeling)
 
 @app.route("/get-translated", methods=["GET"])
 def getTranslatedData():
-    data = request.get_json()
+    data = request.get_json(silent=True) or request.args
     id = data.get("id")
 
     # Get user from database
@@ -290,5 +571,48 @@ def getTranslatedData():
     )
 
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def getJob(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"message": "Job not found"}), 404
+
+    job.pop("result")
+    return jsonify({"data": job, "status": "success"}), 200
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def getJobResult(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"message": "Job not found"}), 404
+
+    if job["status"] == "failed":
+        return jsonify({"status": "failed", "error": job["error"]}), 500
+    if job["status"] != "succeeded":
+        return jsonify({"status": job["status"], "stages": job["stages"]}), 202
+
+    return jsonify(job["result"]), 200
+
+
+@app.route("/translation-cache/stats", methods=["GET"])
+def translationCacheStats():
+    return jsonify({"data": translation_cache.stats(), "status": "success"}), 200
+
+
+@app.route("/blog-cache/stats", methods=["GET"])
+def blogCacheStats():
+    return jsonify({"data": blog_cache.stats(), "status": "success"}), 200
+
+
+@app.route("/providers/stats", methods=["GET"])
+def providerStats():
+    stats = {
+        provider: get_provider_policy(provider).stats()
+        for provider in ("gemini", "google_translate", "speech")
+    }
+    return jsonify({"data": stats, "status": "success"}), 200
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,69 @@
+"""
+Translate many documents from the command line, e.g. to backfill existing
+posts into new languages.
+
+Usage:
+    python batch_translate.py posts.jsonl --languages Hindi,Tamil --email me@example.com
+
+The input has one JSON object per line with a "content" field and an
+optional "id" (use "-" to read stdin). One NDJSON result per document is
+written to stdout as soon as it is translated.
+"""
+import argparse
+import json
+import os
+import sys
+
+# A CLI run does not need the web process' job workers or client warm-up
+os.environ.setdefault("JOB_EMBEDDED_WORKERS", "0")
+os.environ.setdefault("WARMUP_CLIENTS", "false")
+
+from app import INDIAN_LANGUAGES, db, enqueueScoring
+from helpers.clients import get_translator
+from pipeline import translate_batch_and_store
+
+
+def read_documents(path):
+    source = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with source:
+        return [json.loads(line) for line in source if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSONL file of documents, or - for stdin")
+    parser.add_argument(
+        "--languages", required=True, help="comma separated languages, e.g. Hindi,Tamil"
+    )
+    parser.add_argument("--email", help="owner of the stored translations")
+    parser.add_argument(
+        "--no-store", action="store_true", help="print the translations without storing them"
+    )
+    parser.add_argument(
+        "--score",
+        action="store_true",
+        help="queue quality scoring for the stored translations",
+    )
+    args = parser.parse_args()
+
+    languages = [item.strip() for item in args.languages.split(",")]
+    unknown = [language for language in languages if language not in INDIAN_LANGUAGES]
+    if unknown:
+        parser.error(f"Unsupported languages: {', '.join(unknown)}")
+
+    results = translate_batch_and_store(
+        db,
+        get_translator(),
+        read_documents(args.input),
+        args.email,
+        {language: INDIAN_LANGUAGES[language] for language in languages},
+        store=not args.no_store,
+        score=args.score,
+        enqueue_scoring=enqueueScoring,
+    )
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Benchmark the backend offline, against local stand-ins for its providers.
+
+Usage:
+    python benchmark.py --scenarios process-data,get-blog --concurrency 1,8,32 --requests 100
+
+Gemini, Google Translate, the speech service and AstraDB are replaced by the
+fakes in helpers/fakeProviders.py, whose latencies are drawn from the given
+distributions ("fixed:MS", "uniform:LOW,HIGH" or "lognormal:MEDIAN,SIGMA").
+Each scenario is driven through the WSGI app of a single worker process at
+every concurrency level. The report covers throughput, p50/p95/p99 latency,
+CPU time per request, peak RSS, Gemini calls and input tokens per request and
+the time spent in each pipeline stage.
+
+Save a run with --output and compare a later run against it with --baseline
+to fail on p95 latency regressions.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Measure provider calls, not the persistent cache, queued jobs or warm-up
+os.environ.setdefault("JOB_EMBEDDED_WORKERS", "0")
+os.environ.setdefault("WARMUP_CLIENTS", "false")
+os.environ.setdefault("TRACE_SLOW_SECONDS", "0")
+os.environ["TRANSLATION_CACHE_DB"] = ""
+os.environ["BLOG_CACHE_REDIS_URL"] = ""
+
+import app
+import blog
+from helpers import clients, telemetry
+from helpers.fakeProviders import (
+    FakeDatabase,
+    FakeGoogleTranslator,
+    FakeLLM,
+    FakeSpeechBackend,
+    generate_test_video,
+    load_recordings,
+)
+from helpers.telemetry import TracedDatabase
+from helpers.translationCache import TranslationCache
+from helpers.videoProcessor import VideoTranscriptionTranslator
+
+SCENARIOS = ["process-data", "transcribe-video", "fetch-user-blogs", "get-blog"]
+WORDS = (
+    "the river carries stories from the mountains to the sea and every village "
+    "along its banks keeps a different version of the same old song"
+).split()
+
+
+def make_text(chars, rng, tag=""):
+    """
+    Paragraphs of plain sentences, about chars long
+    """
+    paragraphs = []
+    size = 0
+    while size < chars:
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            words = rng.choices(WORDS, k=rng.randint(8, 16))
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    if tag:
+        paragraphs[0] = f"{tag} {paragraphs[0]}"
+    return "\n\n".join(paragraphs)[: max(chars, 1)]
+
+
+def seed_blogs(db, users, blogs_per_user, languages, rng):
+    """
+    Store blogs in every language and their summaries, as insert_blog does
+    """
+    blogs = []
+    rows = []
+    summaries = []
+    for user in range(users):
+        email = f"user{user}@example.com"
+        for number in range(blogs_per_user):
+            blog_id = f"blog-{user}-{number}"
+            title = f"Story {number}"
+            for language in languages:
+                rows.append(
+                    {
+                        "email": email,
+                        "blog_id": blog_id,
+                        "blogtext": make_text(1500, rng),
+                        "blogtitle": title,
+                        "language": language,
+                        "labels": ["Travel"],
+                        "publish": True,
+                        "url": f"story-{user}-{number}",
+                        "updatedat": time.time(),
+                    }
+                )
+                blogs.append((email, blog_id, language))
+            summaries.append(
+                {
+                    "email": email,
+                    "blog_id": blog_id,
+                    "blogtitle": title,
+                    "snippet": "Story",
+                    "labels": ["Travel"],
+                    "languages": list(languages),
+                    "sourcelanguage": languages[0],
+                    "createdat": int(time.time() * 1e6) + number,
+                }
+            )
+    db["blog"]._insert_many(rows)
+    db["blog_summary"]._insert_many(summaries)
+    return blogs
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        recordings = load_recordings(args.recordings) if args.recordings else {}
+
+        self.fake_db = FakeDatabase(args.db_latency, self.rng)
+        app.db = blog.db = TracedDatabase(self.fake_db)
+
+        self.translator = VideoTranscriptionTranslator(
+            None,
+            cache=TranslationCache(),
+            prompt_mode=args.prompt_mode,
+            speech_backend=FakeSpeechBackend(
+                args.speech_latency, args.error_rate, rng=self.rng
+            ),
+        )
+        self.translator.llm = FakeLLM(
+            args.gemini_latency, args.error_rate, recordings.get("gemini"), self.rng
+        )
+        self.translator.google_translator = FakeGoogleTranslator(
+            args.google_translate_latency,
+            args.error_rate,
+            recordings.get("google_translate"),
+            self.rng,
+        )
+        clients.register("translator", self.translator)
+
+        self.languages = [item.strip() for item in args.languages.split(",")]
+        self.blogs = seed_blogs(self.fake_db, args.users, args.blogs_per_user, self.languages, self.rng)
+        self.videos = {}
+        self._clients = threading.local()
+
+    def client(self):
+        if not hasattr(self._clients, "client"):
+            self._clients.client = app.app.test_client()
+        return self._clients.client
+
+    def video(self, seconds):
+        if seconds not in self.videos:
+            path = os.path.join(tempfile.gettempdir(), f"benchmark-{seconds}s.mp4")
+            if not os.path.exists(path):
+                generate_test_video(path, seconds)
+            with open(path, "rb") as f:
+                self.videos[seconds] = f.read()
+        return self.videos[seconds]
+
+    def requests(self):
+        """
+        (name, request(index) -> (ok, response)) for each scenario to run
+        """
+        args = self.args
+        selected = [item.strip() for item in args.scenarios.split(",")]
+        unknown = set(selected) - set(SCENARIOS)
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        def process_data(index):
+            if args.repeat_content:
+                content = make_text(args.text_chars, random.Random(0))
+            else:
+                content = make_text(args.text_chars, random.Random(index), f"Request {index}.")
+            response = self.client().post(
+                "/process-data",
+                data={
+                    "content": content,
+                    "email": "bench@example.com",
+                    "isVideo": "false",
+                    "required_languages": ",".join(self.languages),
+                    "scoreMode": args.score_mode,
+                },
+            )
+            return response.status_code == 200, response
+
+        def transcribe_video(seconds):
+            def request(index):
+                response = self.client().post(
+                    "/transcribe-video",
+                    data={"files": (io.BytesIO(self.video(seconds)), "bench.mp4")},
+                    content_type="multipart/form-data",
+                )
+                ok = response.status_code == 200 and not response.json["status"].startswith("error")
+                return ok, response
+
+            return request
+
+        def fetch_user_blogs(index):
+            body = {"email": f"user{index % args.users}@example.com"}
+            if args.page_size:
+                body["limit"] = args.page_size
+            response = self.client().post("/fetchUserBlogs", json=body)
+            return response.status_code == 200, response
+
+        def get_blog(index):
+            email, blog_id, language = self.blogs[index % len(self.blogs)]
+            response = self.client().post(
+                "/getBlog", json={"email": email, "blog_id": blog_id, "language": language}
+            )
+            return response.status_code == 200 and response.json is not None, response
+
+        for name in selected:
+            if name == "process-data":
+                yield f"process-data[{args.text_chars} chars]", process_data
+            elif name == "transcribe-video":
+                for seconds in [int(value) for value in args.video_seconds.split(",")]:
+                    self.video(seconds)
+                    yield f"transcribe-video[{seconds}s]", transcribe_video(seconds)
+            elif name == "fetch-user-blogs":
+                yield "fetch-user-blogs", fetch_user_blogs
+            elif name == "get-blog":
+                yield "get-blog", get_blog
+
+    def run_level(self, name, request, concurrency):
+        args = self.args
+        # Every level sends the same texts, so each starts with an empty
+        # cache; with --repeat-content only the warm-up misses it
+        self.translator.cache = TranslationCache()
+        for index in range(args.warmup):
+            request(-1 - index)
+
+        traces = []
+        telemetry.add_trace_listener(traces.append)
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+
+        def timed(index):
+            nonlocal errors
+            start = time.perf_counter()
+            try:
+                ok, _ = request(index)
+            except Exception as e:
+                print(f"Request failed: {e}", file=sys.stderr)
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += not ok
+
+        llm = self.translator.llm
+        model = self.translator.GEMINI_MODEL
+        calls_start = llm.calls
+        tokens_start = telemetry.LLM_TOKENS.value(model=model, type="input")
+        cpu_start = cpu_seconds()
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(timed, range(args.requests)))
+        finally:
+            telemetry.remove_trace_listener(traces.append)
+        wall = time.perf_counter() - start
+        cpu = cpu_seconds() - cpu_start
+        calls = llm.calls - calls_start
+        tokens = telemetry.LLM_TOKENS.value(model=model, type="input") - tokens_start
+
+        return {
+            "scenario": name,
+            "concurrency": concurrency,
+            "requests": args.requests,
+            "errors": errors,
+            "throughput": args.requests / wall,
+            "p50_ms": 1000 * percentile(latencies, 0.50),
+            "p95_ms": 1000 * percentile(latencies, 0.95),
+            "p99_ms": 1000 * percentile(latencies, 0.99),
+            "cpu_ms_per_request": 1000 * cpu / args.requests,
+            "peak_rss_mb": peak_rss_mb(),
+            "gemini_calls_per_request": calls / args.requests,
+            "gemini_input_tokens_per_request": tokens / args.requests,
+            "stages": self.stage_summary(traces, sum(latencies)),
+        }
+
+    @staticmethod
+    def stage_summary(traces, request_seconds):
+        durations = {}
+        for trace in traces:
+            for span in trace.spans:
+                durations.setdefault(span["name"], []).append(span["seconds"])
+        return {
+            stage: {
+                "count": len(values),
+                "p50_ms": 1000 * percentile(values, 0.50),
+                "p95_ms": 1000 * percentile(values, 0.95),
+                # Concurrent spans overlap, so shares can add up to over 100%
+                "share": sum(values) / request_seconds if request_seconds else 0.0,
+            }
+            for stage, values in durations.items()
+        }
+
+    def run(self):
+        results = []
+        levels = [int(value) for value in self.args.concurrency.split(",")]
+        for name, request in self.requests():
+            for concurrency in levels:
+                output = io.StringIO()
+                # The pipeline's progress prints would drown the report
+                with contextlib.redirect_stdout(output if not self.args.verbose else sys.stdout):
+                    result = self.run_level(name, request, concurrency)
+                print_result(result, self.args.top_stages)
+                results.append(result)
+        return results
+
+
+def print_result(result, top_stages):
+    print(
+        f"{result['scenario']} x{result['concurrency']}: "
+        f"{result['throughput']:.1f} req/s, "
+        f"p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms, "
+        f"p99 {result['p99_ms']:.0f} ms, "
+        f"{result['cpu_ms_per_request']:.1f} CPU ms/req, "
+        f"peak RSS {result['peak_rss_mb']:.0f} MB, "
+        f"{result['gemini_calls_per_request']:.1f} Gemini calls "
+        f"({result['gemini_input_tokens_per_request']:.0f} input tokens)/req, "
+        f"{result['errors']}/{result['requests']} errors"
+    )
+    stages = sorted(result["stages"].items(), key=lambda item: -item[1]["share"])
+    for stage, summary in stages[:top_stages]:
+        print(
+            f"    {stage:<36} {summary['count']:>6}x  "
+            f"p50 {summary['p50_ms']:8.1f} ms  p95 {summary['p95_ms']:8.1f} ms  "
+            f"{100 * summary['share']:5.0f}% of request time"
+        )
+
+
+def compare(results, baseline_path, max_regression):
+    """
+    Return the levels whose p95 latency regressed past max_regression
+    """
+    with open(baseline_path) as f:
+        baseline = {
+            (result["scenario"], result["concurrency"]): result for result in json.load(f)
+        }
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["scenario"], result["concurrency"]))
+        if previous and result["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            regressions.append(
+                f"{result['scenario']} x{result['concurrency']}: p95 "
+                f"{previous['p95_ms']:.0f} ms -> {result['p95_ms']:.0f} ms"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIOS), help=f"comma separated: {', '.join(SCENARIOS)}"
+    )
+    parser.add_argument("--concurrency", default="1,8", help="comma separated levels")
+    parser.add_argument("--requests", type=int, default=40, help="requests per level")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured requests per level")
+    parser.add_argument("--languages", default="Hindi,Tamil")
+    parser.add_argument("--text-chars", type=int, default=2000, help="/process-data text size")
+    parser.add_argument(
+        "--repeat-content",
+        action="store_true",
+        help="send the same text every time, to measure translation cache hits",
+    )
+    parser.add_argument("--score-mode", default="sync", choices=["sync", "deferred"])
+    parser.add_argument(
+        "--prompt-mode",
+        choices=VideoTranscriptionTranslator.PROMPT_MODES,
+        help="Gemini translation prompt mode (default: TRANSLATION_PROMPT_MODE)",
+    )
+    parser.add_argument("--video-seconds", default="30,120", help="lengths of the test videos")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--blogs-per-user", type=int, default=10)
+    parser.add_argument(
+        "--page-size", type=int, default=0, help="paginate /fetchUserBlogs (0 for the legacy listing)"
+    )
+    parser.add_argument("--gemini-latency", default="lognormal:800,0.5")
+    parser.add_argument("--google-translate-latency", default="lognormal:150,0.4")
+    parser.add_argument("--speech-latency", default="lognormal:1200,0.3")
+    parser.add_argument("--db-latency", default="lognormal:15,0.3")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of failing provider calls")
+    parser.add_argument("--recordings", help="JSONL of recorded provider responses to replay")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--top-stages", type=int, default=8)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's output")
+    args = parser.parse_args()
+
+    results = Benchmark(args).run()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,43 @@
-from db import initialize_client
+from db import get_db
 from flask import request, jsonify
+import base64
+import datetime
+import json
 import re
+import threading
+import time
 import unicodedata
+import weakref
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+from helpers import telemetry
+from helpers.blogCache import blog_cache
+from helpers.clients import get_llm, get_provider_policy
+from helpers.jobQueue import NullJobContext
+from helpers.persistence import UnitOfWork
+from helpers.translationCache import translation_cache
 
-db = initialize_client()
+db = get_db()
+
+SNIPPET_CHARS = 200
+# Sorted Data API finds return a single page of at most 20 documents
+MAX_PAGE_SIZE = 20
+# Dashboard fields that can be requested, mapped to blog_summary fields
+SUMMARY_FIELDS = {
+    "blogTitle": "blogtitle",
+    "label": "labels",
+    "language": "languages",
+    "snippet": "snippet",
+}
+LEGACY_LIST_FIELDS = ["blog_id", "blogtext", "blogtitle", "email", "language", "labels"]
+# Seconds the frontend and CDN may reuse a public blog before revalidating
+PUBLIC_MAX_AGE = int(os.getenv("BLOG_CACHE_MAX_AGE", "60"))
+# Labels are classified once per blog, from this language version
+LABELS_SOURCE_LANGUAGE = "English"
+# Bump to re-classify memoized labels after changing the model or prompt
+LABELS_CACHE_VERSION = "gemini-pro:v1"
+
+_labeling_locks = weakref.WeakValueDictionary()
+_labeling_locks_lock = threading.Lock()
 
 def url_generator(blogTitle):
     normalized_text = unicodedata.normalize('NFKD', blogTitle).encode('ascii', 'ignore').decode('ascii')
@@ -20,14 +52,16 @@ def classify_blog_labels(blog_text: str):
     if not api_key:
         raise ValueError("API key not found in .env file.")
 
-    # Initialize the Google Gemini model with the API key
-    generative_ai = ChatGoogleGenerativeAI(model="gemini-pro", api_key=api_key)
+    # Reuse the shared Google Gemini client for this API key
+    generative_ai = get_llm("gemini-pro", api_key=api_key)
     
     # Construct the prompt to classify the blog text
     prompt = f"Classify the following blog text into relevant categories or labels:\n\n{blog_text}. Donot send unwanted messages if you donot get any topic. Send one or maximum two words per item in the list."
 
     # Get the response from the model
-    response = generative_ai.invoke(prompt)
+    with telemetry.span("classify_blog_labels"):
+        response = get_provider_policy("gemini").call_sync(lambda: generative_ai.invoke(prompt))
+    telemetry.record_llm_usage("gemini-pro", response)
     print(f"Response: {response}")
 
     # Extract the labels from the response (assuming the response object has a 'text' attribute)
@@ -40,7 +74,57 @@ def classify_blog_labels(blog_text: str):
     
     return labels
 
-def insert_blog(req):
+def labels_source_text(email, blog_id):
+    """
+    Text to classify a blog from: its English version, else the original
+    submission it was translated from, else any stored version
+    """
+    blog = db["blog"]
+    row = blog.find_one(
+        {"email": email, "blog_id": blog_id, "language": LABELS_SOURCE_LANGUAGE},
+        projection=["blogtext"],
+    )
+    if row is None:
+        # Blogs published from /process-data use the raw input id as blog_id
+        raw_input = db["raw_input"].find_one({"id": blog_id}, projection=["content"])
+        if raw_input is not None:
+            return raw_input.get("content")
+        row = blog.find_one({"email": email, "blog_id": blog_id}, projection=["blogtext"])
+    return row.get("blogtext") if row else None
+
+def label_blog(email, blog_id, job=None):
+    """
+    Classify a blog once from its source text, memoized by text hash, and
+    store the labels on every language version and the blog summary
+    """
+    job = job or NullJobContext()
+    with _labeling_locks_lock:
+        lock = _labeling_locks.setdefault((email, blog_id), threading.Lock())
+
+    # Jobs for the other languages of the blog wait and reuse the memoized labels
+    with job.stage("classification"), lock:
+        source_text = labels_source_text(email, blog_id)
+        if not source_text:
+            return {"blog_id": blog_id, "labels": None, "status": "no source text"}
+        labels = translation_cache.get_or_fetch_sync(
+            source_text,
+            "labels",
+            "gemini-labels",
+            LABELS_CACHE_VERSION,
+            lambda: classify_blog_labels(source_text),
+        )
+        print(f"Labels: {labels}")
+
+    with job.stage("storage"):
+        unit = UnitOfWork(db)
+        unit.update_many("blog", {"email": email, "blog_id": blog_id}, {"$set": {"labels": labels}})
+        unit.update("blog_summary", {"email": email, "blog_id": blog_id}, {"$set": {"labels": labels}})
+        unit.commit()
+        blog_cache.invalidate(email, blog_id)
+
+    return {"blog_id": blog_id, "labels": labels, "status": "success"}
+
+def insert_blog(req, enqueue_labeling=None):
     try: 
         data = req.get_json()
         email = data.get('email')
@@ -51,11 +135,10 @@ def insert_blog(req):
         language = data.get('language')
 
         url = url_generator(blogtitle)
-        labels = classify_blog_labels(blogtext)
-        print(f"Labels: {labels}")
-        
-        blog = db["blog"]
-        blog.insert_one({
+
+        # Labels are filled in by the classify-blog-labels job after the write
+        unit = UnitOfWork(db)
+        unit.insert("blog", {
             "email": email,
             "blog_id": blog_id,
             "url": url,
@@ -63,8 +146,24 @@ def insert_blog(req):
             "blogtitle": blogtitle,
             "publish": publish,
             "language": language,
-            "labels": labels
+            "labels": [],
+            "updatedat": time.time()
         })
+        # The first language stored becomes the blog's dashboard summary
+        unit.update("blog_summary", {"email": email, "blog_id": blog_id}, {
+            "$setOnInsert": {
+                "blogtitle": blogtitle,
+                "snippet": make_snippet(blogtext),
+                "labels": [],
+                "sourcelanguage": language,
+                "createdat": time.time_ns() // 1000,
+            },
+            "$addToSet": {"languages": language}
+        }, upsert=True)
+        unit.commit()
+        blog_cache.invalidate(email, blog_id, urls=[url])
+        if enqueue_labeling:
+            enqueue_labeling(email, blog_id)
 
         return jsonify({"message": "Blog inserted successfully", "email": email, "blog_id": blog_id }), 201
 
@@ -92,13 +191,75 @@ def transform_blogs(blog_list):
     return transformed_blogs
 
 
+def make_snippet(blog_text, max_chars=SNIPPET_CHARS):
+    text = " ".join((blog_text or "").split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+
+def encode_cursor(createdat):
+    return base64.urlsafe_b64encode(json.dumps({"createdat": createdat}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["createdat"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor.") from None
+
+
+def list_user_blogs(email, limit=MAX_PAGE_SIZE, cursor=None, fields=None):
+    """
+    Return one page of the user's blogs, newest first, from the per-blog
+    summaries, together with the cursor of the next page (None on the last
+    page). Reads only the summary fields, never the blog bodies.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    fields = fields or list(SUMMARY_FIELDS)
+    unknown = [field for field in fields if field not in SUMMARY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    filter = {"email": email}
+    if cursor:
+        filter["createdat"] = {"$lt": decode_cursor(cursor)}
+    projection = ["blog_id", "createdat"] + [SUMMARY_FIELDS[field] for field in fields]
+
+    # Ask for one extra summary to know whether there is a next page
+    rows = list(db["blog_summary"].find(
+        filter, projection=projection, sort={"createdat": -1}, limit=limit + 1
+    ))
+    blogs = [
+        {"blogId": row["blog_id"], "email": email, **{
+            field: row.get(SUMMARY_FIELDS[field]) for field in fields
+        }}
+        for row in rows[:limit]
+    ]
+    next_cursor = encode_cursor(rows[limit - 1]["createdat"]) if len(rows) > limit else None
+    return blogs, next_cursor
+
+
 def get_user_blog(req):
     try:
         data = req.get_json()
         email = data.get('email')
 
+        # Paginated listing from the blog summaries
+        if data.get('limit') or data.get('cursor'):
+            try:
+                blogs, next_cursor = list_user_blogs(
+                    email,
+                    data.get('limit') or MAX_PAGE_SIZE,
+                    data.get('cursor'),
+                    data.get('fields'),
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({"blogs": blogs, "nextCursor": next_cursor}), 200
+
         blog = db["blog"]
-        result = list(blog.find({"email": email}))  # Convert cursor to list
+        result = list(blog.find({"email": email}, projection=LEGACY_LIST_FIELDS))  # Convert cursor to list
 
 
         transformed_blogs = transform_blogs(result)
@@ -118,14 +279,63 @@ def get_blog(req):
         language = data.get('language')
 
         blog = db["blog"]
-        result = blog.find_one({"blog_id": blog_id, "email": email, "language": language})
+        # The author reads their own blog here, and must see their edits at once
+        entry = blog_cache.get_or_fetch(
+            f"id:{email}:{blog_id}:{language}",
+            lambda: blog.find_one({"blog_id": blog_id, "email": email, "language": language}),
+            consistent=True,
+        )
+        if entry is None:
+            return jsonify(None), 200
+
+        return blog_response(req, entry, public=False)
+    except Exception as e:
+        print(f"Error getting blog: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def get_blog_by_url(req, url):
+    """
+    Public read of a published blog by its URL slug, in the requested
+    language or the first one found
+    """
+    try:
+        language = req.args.get('language')
+        filter = {"url": url, "publish": True}
+        if language:
+            filter["language"] = language
+
+        blog = db["blog"]
+        entry = blog_cache.get_or_fetch(
+            f"url:{url}:{language or ''}", lambda: blog.find_one(filter)
+        )
+        if entry is None:
+            return jsonify({"error": "Blog not found"}), 404
 
-        return jsonify(result), 200
+        return blog_response(req, entry, public=True)
     except Exception as e:
         print(f"Error getting blog: {e}")
         return jsonify({"error": str(e)}), 500
 
-def update_blog(req):
+def blog_response(req, entry, public):
+    """
+    JSON response with ETag and Last-Modified validators, answering 304 when
+    the client's copy is still current
+    """
+    response = jsonify(entry["blog"])
+    response.set_etag(entry["etag"])
+    if entry["lastModified"]:
+        response.last_modified = datetime.datetime.fromtimestamp(
+            entry["lastModified"], tz=datetime.timezone.utc
+        )
+    if public:
+        response.cache_control.public = True
+        response.cache_control.max_age = PUBLIC_MAX_AGE
+    else:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response.make_conditional(req)
+
+def update_blog(req, enqueue_labeling=None):
     try:
         data = req.get_json()
         email = data.get('email')
@@ -136,19 +346,31 @@ def update_blog(req):
         language = data.get('language')
 
         url = url_generator(blogtitle)
-        labels = classify_blog_labels(blogtext)
-        print(f"Labels: {labels}")
-        
-        blog = db["blog"]
-        blog.update_one({"blog_id": blog_id, "email": email, "language": language}, 
+
+        unit = UnitOfWork(db)
+        unit.update("blog", {"blog_id": blog_id, "email": email, "language": language}, 
         {
             "$set": {
+                "url": url,
                 "blogtext": blogtext,
                 "blogtitle": blogtitle,
                 "publish": publish,
-                "labels": labels
+                "updatedat": time.time()
+            }
+        })
+        # Only edits of the summary's language change the dashboard summary
+        unit.update("blog_summary", {"blog_id": blog_id, "email": email, "sourcelanguage": language}, {
+            "$set": {
+                "blogtitle": blogtitle,
+                "snippet": make_snippet(blogtext)
             }
         })
+        unit.commit()
+        # Entries under the old URL are the blog's own and go with it; the
+        # new URL may hold another blog that had the same slug
+        blog_cache.invalidate(email, blog_id, urls=[url])
+        if enqueue_labeling:
+            enqueue_labeling(email, blog_id)
 
         return jsonify({"message": "Blog updated successfully", "email": email, "blog_id": blog_id }), 201
 
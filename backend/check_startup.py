@@ -0,0 +1,73 @@
+"""
+Measure the import time of the web app and fail if it exceeds the budget.
+
+Usage: python check_startup.py [module]
+
+Heavy modules (moviepy, nltk, sklearn, rouge_score, langchain, googletrans)
+must be imported lazily by the features that need them, so that workers
+become ready quickly. IMPORT_BUDGET_MS sets the budget (default 1000 ms).
+"""
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = [
+    "moviepy",
+    "nltk",
+    "sklearn",
+    "rouge_score",
+    "langchain_google_genai",
+    "googletrans",
+    "pydub",
+]
+
+
+def measure(module):
+    env = dict(
+        os.environ,
+        WARMUP_CLIENTS="false",
+        JOB_EMBEDDED_WORKERS="0",
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        raise SystemExit(f"Importing {module} failed")
+
+    # Lines look like "import time:   self |   cumulative | module"
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        timings[name.strip()] = int(cumulative) / 1000
+    return timings
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "app"
+    budget_ms = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+    timings = measure(module)
+    total_ms = timings[module]
+
+    print(f"Slowest top-level imports of {module}:")
+    top_level = {name: ms for name, ms in timings.items() if "." not in name}
+    for name, ms in sorted(top_level.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    eager = [name for name in HEAVY_MODULES if name in timings]
+    if eager:
+        print(f"Heavy modules imported eagerly: {', '.join(eager)}")
+
+    print(f"Import time of {module}: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    if total_ms > budget_ms or eager:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
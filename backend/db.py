@@ -1,6 +1,8 @@
 from astrapy import DataAPIClient
 import os
+import threading
 from dotenv import load_dotenv
+from helpers.telemetry import TracedDatabase
 
 load_dotenv()
 
@@ -19,12 +21,28 @@ def initialize_client():
         client = DataAPIClient(token)
         # print("CLient - ", client)
         db = client.get_database_by_api_endpoint(endpoint)
-        return db
+        # Every collection operation is timed for /metrics and request traces
+        return TracedDatabase(db)
     except Exception as e:
         print(f"Error initializing AstraDB client: {e}")
         return None
 
 
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db():
+    """
+    Return the process-wide AstraDB handle, creating it on first use
+    """
+    global _db
+    with _db_lock:
+        if _db is None:
+            _db = initialize_client()
+        return _db
+
+
 def fetch_collection_data(db, collection_name):
     try:
         collection = db[collection_name]
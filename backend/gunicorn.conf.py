@@ -0,0 +1,16 @@
+"""
+Gunicorn settings for serving the app: `gunicorn app:app`
+
+Each worker process runs one shared event loop for all provider calls.
+Request threads only wait on it, so a few workers with many threads
+serve many concurrent translations. The app is not preloaded, because
+importing it starts the job workers and the event loop thread.
+"""
+import os
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "32"))
+# Translating a long post into many languages can take minutes
+timeout = int(os.getenv("WEB_TIMEOUT", "300"))
@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class SilenceAwareChunker:
+    """
+    Split a stream of mono 16-bit PCM into speech chunks at pauses.
+
+    Frames are classified as silent with an energy-based VAD. A chunk is cut
+    at the first pause after min_seconds, or at the latest pause before
+    max_seconds (a hard cut only if there was none). Silent stretches are
+    trimmed to a short lead-in and chunks without speech are skipped, so the
+    recognizer is not called on silence.
+    """
+
+    def __init__(
+        self,
+        sample_rate=16000,
+        sample_width=2,
+        min_seconds=10,
+        max_seconds=30,
+        frame_ms=30,
+        min_silence_ms=400,
+        silence_threshold_db=-40,
+        padding_ms=200,
+        min_speech_ms=300,
+    ):
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * sample_width
+        self.frame_samples = self.frame_bytes // sample_width
+        self.min_frames = int(min_seconds * 1000 / frame_ms)
+        self.max_frames = int(max_seconds * 1000 / frame_ms)
+        self.min_silence_frames = max(1, int(min_silence_ms / frame_ms))
+        self.padding_frames = int(padding_ms / frame_ms)
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        # Compare mean square energy against the threshold expressed in dBFS
+        self.silence_energy = (32768.0 * 10 ** (silence_threshold_db / 20)) ** 2
+
+    def _silent_flags(self, frames):
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float64)
+        energy = (samples.reshape(-1, self.frame_samples) ** 2).mean(axis=1)
+        return energy < self.silence_energy
+
+    def _emit(self, frames, flags):
+        if flags.count(False) >= self.min_speech_frames:
+            return bytes(frames)
+        return None
+
+    def chunks(self, blocks):
+        """
+        Yield speech chunks (bytes) from an iterable of PCM blocks
+        """
+        frame_bytes = self.frame_bytes
+        pending = b""
+        current = bytearray()
+        flags = []  # per-frame silent flag for the frames in current
+        silence_run = 0
+        pause_at = None  # frame index of the latest pause in current
+
+        for block in blocks:
+            pending += block
+            usable = len(pending) // frame_bytes * frame_bytes
+            if not usable:
+                continue
+            frames, pending = pending[:usable], pending[usable:]
+
+            for i, silent in enumerate(self._silent_flags(frames)):
+                frame = frames[i * frame_bytes : (i + 1) * frame_bytes]
+                silence_run = silence_run + 1 if silent else 0
+
+                if silent and False not in flags:
+                    # No speech yet: keep only a short lead-in of silence
+                    current += frame
+                    flags.append(True)
+                    if len(flags) > self.padding_frames:
+                        del current[:frame_bytes]
+                        del flags[0]
+                    continue
+
+                current += frame
+                flags.append(bool(silent))
+
+                if silence_run == self.min_silence_frames:
+                    if len(flags) >= self.min_frames:
+                        chunk = self._emit(current, flags)
+                        if chunk:
+                            yield chunk
+                        current, flags, pause_at = bytearray(), [], None
+                        continue
+                    pause_at = len(flags)
+
+                if len(flags) >= self.max_frames:
+                    cut = pause_at or len(flags)
+                    chunk = self._emit(current[: cut * frame_bytes], flags[:cut])
+                    if chunk:
+                        yield chunk
+                    current = current[cut * frame_bytes :]
+                    flags = flags[cut:]
+                    pause_at = None
+
+        if pending:
+            # Pad the trailing partial frame with silence
+            current += pending + b"\x00" * (frame_bytes - len(pending))
+            flags.extend(self._silent_flags(current[-frame_bytes:]).tolist())
+        if current:
+            chunk = self._emit(current, flags)
+            if chunk:
+                yield chunk
@@ -0,0 +1,96 @@
+import subprocess
+import tempfile
+import time
+
+import speech_recognition as sr
+
+from helpers import telemetry
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit PCM
+BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH
+
+
+def get_ffmpeg_executable():
+    """
+    Use the ffmpeg binary bundled with imageio-ffmpeg (a moviepy dependency),
+    falling back to ffmpeg on the PATH
+    """
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def stream_pcm(media_path, block_bytes=BYTES_PER_SECOND):
+    """
+    Decode the audio track of a media file to mono 16 kHz 16-bit PCM through
+    an ffmpeg pipe, yielding blocks of block_bytes (the last one may be
+    shorter). Only ffmpeg's error output is written to disk.
+
+    The decode is recorded as the extract_audio stage, from its start to the
+    end of the audio, with the time spent waiting on ffmpeg as
+    waiting_seconds.
+    """
+    start = time.perf_counter()
+    waiting = 0.0
+    error = None
+    # ffmpeg's errors go to a file rather than a pipe: a pipe nobody reads
+    # until stdout ends would fill up on damaged media and block ffmpeg
+    errors = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        [
+            get_ffmpeg_executable(),
+            "-nostdin",
+            "-v",
+            "error",
+            "-i",
+            media_path,
+            "-vn",
+            "-ac",
+            "1",
+            "-ar",
+            str(SAMPLE_RATE),
+            "-f",
+            "s16le",
+            "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=errors,
+    )
+    try:
+        while True:
+            read_start = time.perf_counter()
+            block = process.stdout.read(block_bytes)
+            waiting += time.perf_counter() - read_start
+            if not block:
+                break
+            yield block
+
+        process.wait()
+        if process.returncode != 0:
+            errors.seek(0)
+            message = errors.read().decode("utf-8", "replace").strip()
+            raise RuntimeError(f"ffmpeg failed to decode {media_path}: {message}")
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Runs when the consumer stops early too, so ffmpeg never lingers
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        errors.close()
+        telemetry.record_span("extract_audio", start, error, waiting_seconds=round(waiting, 4))
+
+
+def stream_speech_chunks(media_path, chunker):
+    """
+    Yield in-memory sr.AudioData chunks split at pauses by a
+    SilenceAwareChunker, skipping silent regions
+    """
+    for chunk in chunker.chunks(stream_pcm(media_path)):
+        yield sr.AudioData(chunk, SAMPLE_RATE, SAMPLE_WIDTH)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import re
+
+from helpers import telemetry
+from helpers.resilience import TokenBucket
+
+PACK_MAX_DOC_CHARS = int(os.getenv("BATCH_PACK_MAX_DOC_CHARS", "1500"))
+PACK_MAX_CHARS = int(os.getenv("BATCH_PACK_MAX_CHARS", "6000"))
+PACK_MAX_DOCS = int(os.getenv("BATCH_PACK_MAX_DOCS", "10"))
+REQUESTS_PER_MINUTE = int(os.getenv("BATCH_REQUESTS_PER_MINUTE", "300"))
+
+# Shared by every batch in the process, so concurrent /process-batch requests
+# stay under one limit together. A burst of 1 spaces the calls out evenly.
+_batch_rate_limiter = TokenBucket(REQUESTS_PER_MINUTE / 60, burst=1)
+
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def pack_documents(documents):
+    """
+    Group (index, text) pairs into packs that are safe to translate in one
+    prompt. Documents longer than PACK_MAX_DOC_CHARS are kept on their own.
+    """
+    packs = []
+    current = []
+    current_chars = 0
+    for index, text in documents:
+        if len(text) > PACK_MAX_DOC_CHARS:
+            packs.append([(index, text)])
+            continue
+        if current and (
+            current_chars + len(text) > PACK_MAX_CHARS or len(current) >= PACK_MAX_DOCS
+        ):
+            packs.append(current)
+            current, current_chars = [], 0
+        current.append((index, text))
+        current_chars += len(text)
+    if current:
+        packs.append(current)
+    return packs
+
+
+def _packed_prompt(texts, target_language):
+    return f"""
+        Translate each text in the following JSON array to {target_language}.
+
+        {json.dumps(texts, ensure_ascii=False)}
+
+        Respond with only a JSON array of the translations, in the same order
+        and with the same number of items, without any additional comments.
+        """
+
+
+def parse_packed_response(content, expected):
+    """
+    Parse a packed translation response, returning None unless it is a JSON
+    array of exactly `expected` strings
+    """
+    try:
+        translations = json.loads(CODE_FENCE.sub("", content.strip()))
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    if (
+        not isinstance(translations, list)
+        or len(translations) != expected
+        or not all(isinstance(text, str) for text in translations)
+    ):
+        return None
+    return translations
+
+
+class BatchTranslator:
+    """
+    Translates many documents into many languages, packing small documents
+    into shared Gemini prompts under the process-wide batch rate limit
+    """
+
+    def __init__(self, translator, rate_limiter=None):
+        self.translator = translator
+        self.rate_limiter = rate_limiter or _batch_rate_limiter
+
+    async def _translate_single(self, text, language):
+        await self.rate_limiter.acquire()
+        return await self.translator.translate_text_async(text, language)
+
+    async def _translate_pack(self, pack, language):
+        """
+        Translate a pack of documents, returning {index: translation}. Falls
+        back to one prompt per document if the packed response is unusable.
+        """
+        translator = self.translator
+        cache = translator.cache
+        results = {}
+        missing = []
+        for index, text in pack:
+            cached = await cache.get_async(
+                text, language, "gemini", translator.GEMINI_CACHE_VERSION
+            )
+            if cached is not None:
+                results[index] = cached
+            else:
+                missing.append((index, text))
+
+        if len(missing) > 1:
+            await self.rate_limiter.acquire()
+            prompt = _packed_prompt([text for _, text in missing], language)
+            response = await translator._call("gemini", lambda: translator.llm.ainvoke(prompt))
+            telemetry.record_llm_usage(translator.GEMINI_MODEL, response)
+            translations = parse_packed_response(response.content, len(missing))
+            if translations is not None:
+                for (index, text), translation in zip(missing, translations):
+                    await cache.set_async(
+                        text, language, "gemini", translator.GEMINI_CACHE_VERSION, translation
+                    )
+                    results[index] = translation
+                return results
+            print(f"Packed {language} response could not be parsed, translating one by one")
+
+        translations = await asyncio.gather(
+            *[self._translate_single(text, language) for _, text in missing]
+        )
+        for (index, _), translation in zip(missing, translations):
+            results[index] = translation
+        return results
+
+    async def translate_documents(self, documents, languages):
+        """
+        Translate a list of document texts into every language, yielding
+        (index, translations, errors) as soon as each document is complete
+        """
+        if not languages:
+            for index in range(len(documents)):
+                yield index, {}, {}
+            return
+
+        remaining = {index: len(languages) for index in range(len(documents))}
+        translations = {index: {} for index in range(len(documents))}
+        errors = {index: {} for index in range(len(documents))}
+        completed = asyncio.Queue()
+
+        async def run_pack(pack, language):
+            try:
+                results = await self._translate_pack(pack, language)
+            except Exception as e:
+                print(f"Error translating batch to {language}: {e}")
+                results = {}
+                for index, _ in pack:
+                    errors[index][language] = str(e)
+
+            for index, _ in pack:
+                if index in results:
+                    translations[index][language] = results[index]
+                elif language not in errors[index]:
+                    errors[index][language] = "missing translation"
+                remaining[index] -= 1
+                if remaining[index] == 0:
+                    completed.put_nowait(index)
+
+        packs = pack_documents(list(enumerate(documents)))
+        tasks = [
+            asyncio.create_task(run_pack(pack, language))
+            for language in languages
+            for pack in packs
+        ]
+        try:
+            for _ in range(len(documents)):
+                index = await completed.get()
+                yield index, translations.pop(index), errors.pop(index)
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from helpers.lruCache import LRUCache
+
+
+class RedisBlogStore:
+    """
+    Optional shared cache tier, so that web workers and hosts share cached
+    blogs and see each other's invalidations
+    """
+
+    def __init__(self, url, ttl_seconds):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("The shared blog cache requires `pip install redis`") from e
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key):
+        value = self.client.get(key)
+        if value is None:
+            return False, None
+        return True, json.loads(value)
+
+    def set(self, key, value, ttl_seconds=None):
+        self.client.set(key, json.dumps(value, default=str), ex=ttl_seconds or self.ttl_seconds)
+
+
+def make_etag(blog):
+    payload = json.dumps(blog, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+class BlogCache:
+    """
+    Read-through cache for blog documents. Entries are invalidated per blog:
+    invalidate(email, blog_id) records when the blog last changed, and any
+    entry fetched before that (under any key, e.g. an old URL) is a miss.
+    URLs can be invalidated too, for entries of other blogs under a slug
+    that a blog has just taken.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=300, store=None):
+        self.local = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.store = store
+        # Invalidation stamps must outlive every entry they can invalidate,
+        # and are kept apart so that entries cannot evict them
+        self._stamp_ttl = max(ttl_seconds, store.ttl_seconds if store else 0)
+        self.invalidations = LRUCache(max_entries=max_entries, ttl_seconds=self._stamp_ttl)
+        self._lock = threading.Lock()
+        self._stats = defaultdict(int)
+        self._stats["hit_seconds"] = 0.0
+        self._stats["fetch_seconds"] = 0.0
+
+    @classmethod
+    def from_env(cls):
+        store = None
+        redis_url = os.getenv("BLOG_CACHE_REDIS_URL")
+        if redis_url:
+            store = RedisBlogStore(
+                redis_url, ttl_seconds=int(os.getenv("BLOG_CACHE_SHARED_TTL", "3600"))
+            )
+
+        return cls(
+            max_entries=int(os.getenv("BLOG_CACHE_SIZE", "1024")),
+            ttl_seconds=int(os.getenv("BLOG_CACHE_TTL", "300")),
+            store=store,
+        )
+
+    def _store_get(self, key):
+        try:
+            return self.store.get(key)
+        except Exception as e:
+            print(f"Error reading shared blog cache: {e}")
+            return False, None
+
+    def _store_set(self, key, value, ttl_seconds=None):
+        try:
+            self.store.set(key, value, ttl_seconds)
+        except Exception as e:
+            print(f"Error writing shared blog cache: {e}")
+
+    def _stamp(self, key):
+        # The shared tier is authoritative, as other workers invalidate there
+        if self.store is not None:
+            found, stamp = self._store_get(key)
+        else:
+            found, stamp = self.invalidations.get(key)
+        return stamp if found else 0.0
+
+    def _invalidated_at(self, entry):
+        stamp = self._stamp(f"invalidated:{entry['ref'][0]}:{entry['ref'][1]}")
+        if entry.get("url"):
+            stamp = max(stamp, self._stamp(f"invalidated-url:{entry['url']}"))
+        return stamp
+
+    def _lookup(self, key):
+        found, entry = self.local.get(key)
+        tier = "local_hits"
+        if not found and self.store is not None:
+            found, entry = self._store_get(key)
+            tier = "shared_hits"
+            if found:
+                self.local.set(key, entry)
+        if not found:
+            return None, None
+
+        if entry["cachedAt"] < self._invalidated_at(entry):
+            self.local.delete(key)
+            return None, None
+        return entry, tier
+
+    def get_or_fetch(self, key, fetch, consistent=False):
+        """
+        Return the cached entry for key (a dict with blog, etag and
+        lastModified), calling fetch() on a miss. Returns None, without
+        caching, if fetch() finds no blog.
+
+        consistent=True is for readers who must see every update at once,
+        e.g. a blog's author: without a shared tier, other workers'
+        invalidations are not visible, so fetch() is called every time.
+        """
+        start = time.perf_counter()
+        entry, tier = (None, None) if consistent and self.store is None else self._lookup(key)
+        if entry is not None:
+            self._record(tier, hit_seconds=time.perf_counter() - start)
+            return entry
+
+        # Stamp the entry with the time the read started, so an update that
+        # lands while the read is in flight still invalidates it
+        cached_at = time.time()
+        fetch_start = time.perf_counter()
+        blog = fetch()
+        self._record("misses", fetch_seconds=time.perf_counter() - fetch_start)
+        if blog is None:
+            return None
+
+        entry = {
+            "blog": blog,
+            "etag": make_etag(blog),
+            "lastModified": blog.get("updatedat"),
+            "ref": [blog.get("email"), blog.get("blog_id")],
+            "url": blog.get("url"),
+            "cachedAt": cached_at,
+        }
+        self.local.set(key, entry)
+        if self.store is not None:
+            self._store_set(key, entry)
+        return entry
+
+    def invalidate(self, email, blog_id, urls=()):
+        """
+        Drop every cached entry of the blog, in all languages and under
+        every key, and every entry of any blog stored under one of urls
+        """
+        stamp = time.time()
+        keys = [f"invalidated:{email}:{blog_id}"]
+        keys += [f"invalidated-url:{url}" for url in urls]
+        for key in keys:
+            self.invalidations.set(key, stamp)
+            if self.store is not None:
+                self._store_set(key, stamp, ttl_seconds=self._stamp_ttl)
+
+    def _record(self, counter, hit_seconds=0.0, fetch_seconds=0.0):
+        with self._lock:
+            self._stats[counter] += 1
+            self._stats["hit_seconds"] += hit_seconds
+            self._stats["fetch_seconds"] += fetch_seconds
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+
+        hits = stats.get("local_hits", 0) + stats.get("shared_hits", 0)
+        misses = stats.get("misses", 0)
+        return {
+            "local_hits": stats.get("local_hits", 0),
+            "shared_hits": stats.get("shared_hits", 0),
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "avg_hit_ms": 1000 * stats["hit_seconds"] / hits if hits else 0.0,
+            "avg_fetch_ms": 1000 * stats["fetch_seconds"] / misses if misses else 0.0,
+            "entries": len(self.local),
+        }
+
+
+blog_cache = BlogCache.from_env()
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import threading
+import weakref
+
+from helpers import eventLoop as event_loop
+
+_lock = threading.RLock()
+_clients = {}
+_loop_clients = weakref.WeakKeyDictionary()
+_overrides = {}
+_build_locks = {}
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _shared(key, factory, loop_bound=False):
+    """
+    Return the shared client for key, creating it once with factory.
+
+    Clients whose async transport binds to an event loop (the Gemini async
+    gRPC channel, googletrans' httpx AsyncClient) are shared per running loop
+    instead of process-wide.
+    """
+    with _lock:
+        if key in _overrides:
+            return _overrides[key]
+
+        clients = _clients
+        loop = _running_loop() if loop_bound else None
+        if loop is not None:
+            clients = _loop_clients.setdefault(loop, {})
+
+        if key in clients:
+            return clients[key]
+        build_lock = _build_locks.setdefault((id(clients), key), threading.Lock())
+
+    # Factories can take seconds of imports, so only callers of the same key
+    # wait for one; lookups of built clients only take the global lock
+    with build_lock:
+        with _lock:
+            if key in clients:
+                return clients[key]
+        client = factory()
+        with _lock:
+            return clients.setdefault(key, client)
+
+
+def register(key, client):
+    """
+    Override a shared client, e.g. with a local fake provider
+    """
+    with _lock:
+        _overrides[key] = client
+
+
+def unregister(key):
+    with _lock:
+        _overrides.pop(key, None)
+
+
+def get_llm(model, **kwargs):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    key = ("llm", model, tuple(sorted(kwargs.items())))
+    return _shared(
+        key, lambda: ChatGoogleGenerativeAI(model=model, **kwargs), loop_bound=True
+    )
+
+
+def get_google_translator():
+    from googletrans import Translator
+
+    return _shared("google_translator", Translator, loop_bound=True)
+
+
+def get_recognizer():
+    import speech_recognition as sr
+
+    return _shared("recognizer", sr.Recognizer)
+
+
+def get_metrics_engine():
+    from helpers.metricsEngine import BatchMetricsEngine
+
+    return _shared("metrics_engine", BatchMetricsEngine)
+
+
+def get_provider_policy(provider):
+    """
+    Shared resilience policy for an outbound provider, e.g. "gemini",
+    "google_translate" or "speech", configured from the environment
+    """
+    from helpers.resilience import ProviderPolicy
+
+    defaults = {"speech": {"max_retries": 3, "backoff_seconds": 1.0}}
+    return _shared(
+        ("policy", provider),
+        lambda: ProviderPolicy.from_env(provider, **defaults.get(provider, {})),
+    )
+
+
+def get_async_collection(db, name):
+    """
+    astrapy AsyncCollection for db[name]; its httpx AsyncClient binds to the
+    running loop, so it is shared per loop
+    """
+    key = ("async_collection", id(db), name)
+    return _shared(key, lambda: db[name].to_async(), loop_bound=True)
+
+
+def get_translator():
+    """
+    Shared VideoTranscriptionTranslator used by every request
+    """
+    from helpers.videoProcessor import VideoTranscriptionTranslator
+
+    return _shared(
+        "translator",
+        lambda: VideoTranscriptionTranslator(os.getenv("GOOGLE_API_KEY")),
+    )
+
+
+def warm_up():
+    """
+    Build the shared clients in a background thread so the first request
+    does not pay for client construction
+    """
+
+    async def build_loop_bound(translator):
+        # Loop-bound clients are built on the shared loop the requests use
+        translator.llm
+        translator.google_translator
+
+    def build():
+        try:
+            translator = get_translator()
+            event_loop.run(build_loop_bound(translator))
+            translator.speech_backend
+            get_metrics_engine()
+            print("Shared clients warmed up")
+        except Exception as e:
+            print(f"Error warming up clients: {e}")
+
+    thread = threading.Thread(target=build, name="client-warmup", daemon=True)
+    thread.start()
+    return thread
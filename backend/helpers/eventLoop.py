@@ -0,0 +1,72 @@
+import asyncio
+import queue
+import threading
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_loop():
+    """
+    Return the process-wide event loop, starting its thread on first use.
+
+    Every request and job runs its provider calls on this one loop, so
+    loop-bound clients and concurrency limits are shared across requests
+    and a worker can multiplex many in-flight calls.
+    """
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=_loop.run_forever, name="event-loop", daemon=True
+            )
+            thread.start()
+        return _loop
+
+
+def run(coro):
+    """
+    Run a coroutine on the shared loop and wait for its result from a
+    worker thread
+    """
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run() cannot be called from the shared event loop; await instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def iterate(async_iterable_factory):
+    """
+    Run an async generator on the shared loop and yield its items
+    synchronously, e.g. for a streaming Flask response
+    """
+    items = queue.Queue()
+    done = object()
+
+    async def consume():
+        try:
+            async for item in async_iterable_factory():
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(consume(), get_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Stop the producer if the client goes away mid-stream
+        future.cancel()
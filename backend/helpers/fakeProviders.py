@@ -0,0 +1,369 @@
+"""
+Local stand-ins for Gemini, Google Translate, the speech service and AstraDB,
+with configurable latency distributions and error rates. They replay
+recorded responses when available and synthesize plausible ones otherwise,
+so the pipeline can be exercised and benchmarked offline.
+"""
+import asyncio
+import copy
+import json
+import math
+import random
+import re
+import subprocess
+import threading
+import time
+import types
+import uuid
+
+from helpers.audioStream import get_ffmpeg_executable
+from helpers.parallelRecognizer import ParallelRecognizer
+from helpers.speechBackends import SpeechBackend
+
+TRANSLATION_PROMPT = re.compile(
+    r"Translate the following (?:(\w+) )?text to (\w+):\s*\n\n(.*?)\n\n\s*Provide only",
+    re.DOTALL,
+)
+PACKED_PROMPT = re.compile(r"JSON array to (\w+)\.\s*\n\n\s*(\[.*\])\s*\n\n\s*Respond", re.DOTALL)
+MULTI_TARGET_PROMPT = re.compile(
+    r"to each of these languages: ([\w, ]+)\.\s*\n\n(.*?)\n\n\s*Respond", re.DOTALL
+)
+
+
+class LatencyModel:
+    """
+    Latency distribution parsed from a spec such as "fixed:50",
+    "uniform:20,80" or "lognormal:800,0.5" (median ms and sigma)
+    """
+
+    def __init__(self, spec, rng=None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",") if value]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self):
+        """
+        Return a latency in seconds
+        """
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(*self.params)
+        else:
+            median, sigma = self.params
+            ms = self.rng.lognormvariate(math.log(median), sigma)
+        return ms / 1000
+
+
+class FakeProvider:
+    def __init__(self, latency, error_rate=0.0, recordings=None, rng=None):
+        self.rng = rng or random.Random()
+        if not isinstance(latency, LatencyModel):
+            latency = LatencyModel(latency, self.rng)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.recordings = recordings or {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            self.calls += 1
+        return self.latency.sample()
+
+    def _maybe_fail(self):
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise RuntimeError("Simulated provider error (429)")
+
+
+def load_recordings(path):
+    """
+    Read recorded responses from a JSONL file of {"provider", "language",
+    "input", "output"} objects, keyed for lookup by the fakes
+    """
+    recordings = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                provider = recordings.setdefault(record["provider"], {})
+                provider[(record.get("language"), record["input"])] = record["output"]
+    return recordings
+
+
+class FakeLLM(FakeProvider):
+    """
+    Chat model stand-in answering translation, packed translation and
+    multi-target translation prompts, with invoke, ainvoke and astream
+    """
+
+    def _respond(self, prompt):
+        packed = PACKED_PROMPT.search(prompt)
+        multi_target = MULTI_TARGET_PROMPT.search(prompt)
+        if multi_target:
+            languages, text = multi_target.group(1).split(", "), multi_target.group(2).strip()
+            content = json.dumps(
+                {language: self._translate(language, text) for language in languages},
+                ensure_ascii=False,
+            )
+        elif packed:
+            language, texts = packed.group(1), json.loads(packed.group(2))
+            content = json.dumps(
+                [self._translate(language, text) for text in texts], ensure_ascii=False
+            )
+        else:
+            match = TRANSLATION_PROMPT.search(prompt)
+            if match:
+                content = self._translate(match.group(2), match.group(3).strip())
+            else:
+                content = "Technology, Education"
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(content) // 4}
+        return types.SimpleNamespace(content=content, usage_metadata=usage)
+
+    def _translate(self, language, text):
+        recorded = self.recordings.get((language, text))
+        if recorded is not None:
+            return recorded
+        return f"[{language}] {text}"
+
+    def invoke(self, prompt, **kwargs):
+        time.sleep(self._start())
+        self._maybe_fail()
+        return self._respond(prompt)
+
+    async def ainvoke(self, prompt, **kwargs):
+        await asyncio.sleep(self._start())
+        self._maybe_fail()
+        return self._respond(prompt)
+
+    async def astream(self, prompt, pieces=8):
+        latency = self._start()
+        self._maybe_fail()
+        response = self._respond(prompt)
+        size = max(1, math.ceil(len(response.content) / pieces))
+        for start in range(0, len(response.content), size):
+            await asyncio.sleep(latency / pieces)
+            yield types.SimpleNamespace(content=response.content[start : start + size])
+
+
+class FakeGoogleTranslator(FakeProvider):
+    """
+    googletrans Translator stand-in
+    """
+
+    async def translate(self, text, dest, src=None):
+        await asyncio.sleep(self._start())
+        self._maybe_fail()
+        recorded = self.recordings.get((dest, text))
+        return types.SimpleNamespace(text=recorded if recorded is not None else f"[{dest}] {text}")
+
+
+class FakeSpeechBackend(SpeechBackend):
+    """
+    Speech backend that recognizes each chunk after a sampled latency, on
+    the same bounded thread pool and resilience policy as the Google backend
+    """
+
+    name = "fake"
+
+    def __init__(self, latency, error_rate=0.0, max_workers=8, rng=None):
+        self.provider = FakeProvider(latency, error_rate, rng=rng)
+        self.max_workers = max_workers
+
+    def _recognize(self, audio_data):
+        time.sleep(self.provider._start())
+        self.provider._maybe_fail()
+        seconds = len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+        return " ".join(["spoken"] * max(1, int(seconds * 2)))
+
+    def transcribe(self, chunks):
+        return ParallelRecognizer(self._recognize, max_workers=self.max_workers).transcribe(chunks)
+
+
+def _matches(document, filter):
+    for key, condition in filter.items():
+        value = document.get(key)
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator == "$lt" and not (value is not None and value < operand):
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(document, projection):
+    if not projection:
+        return copy.deepcopy(document)
+    fields = projection if isinstance(projection, (list, tuple)) else [
+        field for field, include in projection.items() if include
+    ]
+    return {field: copy.deepcopy(document[field]) for field in ["_id", *fields] if field in document}
+
+
+def _apply_update(document, update, inserted):
+    for field, value in update.get("$set", {}).items():
+        document[field] = value
+    if inserted:
+        for field, value in update.get("$setOnInsert", {}).items():
+            document[field] = value
+    for field, value in update.get("$addToSet", {}).items():
+        values = document.setdefault(field, [])
+        if value not in values:
+            values.append(value)
+
+
+class FakeCollection:
+    """
+    In-memory AstraDB collection supporting the operations and filters used
+    by the app. Each operation waits a sampled latency first.
+    """
+
+    OPERATIONS = ("insert_one", "insert_many", "find_one", "find", "update_one", "update_many")
+
+    def __init__(self, name, latency, rng=None):
+        self.name = name
+        self.provider = FakeProvider(latency, rng=rng)
+        self.documents = []
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name not in self.OPERATIONS:
+            raise AttributeError(name)
+        operation = getattr(self, f"_{name}")
+
+        def call(*args, **kwargs):
+            time.sleep(self.provider._start())
+            return operation(*args, **kwargs)
+
+        return call
+
+    def _insert_one(self, document):
+        with self._lock:
+            self.documents.append({"_id": str(uuid.uuid4()), **copy.deepcopy(document)})
+
+    def _insert_many(self, documents):
+        with self._lock:
+            self.documents.extend(
+                {"_id": str(uuid.uuid4()), **copy.deepcopy(document)} for document in documents
+            )
+
+    def _find_one(self, filter, projection=None, **options):
+        with self._lock:
+            for document in self.documents:
+                if _matches(document, filter):
+                    return _project(document, projection)
+        return None
+
+    def _find(self, filter, projection=None, sort=None, limit=None, **options):
+        with self._lock:
+            found = [document for document in self.documents if _matches(document, filter)]
+        for field, direction in (sort or {}).items():
+            found.sort(key=lambda document: document.get(field) or 0, reverse=direction < 0)
+        if limit:
+            found = found[:limit]
+        return [_project(document, projection) for document in found]
+
+    def _update(self, filter, update, many, upsert=False):
+        with self._lock:
+            matched = [document for document in self.documents if _matches(document, filter)]
+            for document in matched if many else matched[:1]:
+                _apply_update(document, update, inserted=False)
+            if not matched and upsert:
+                document = {"_id": str(uuid.uuid4()), **copy.deepcopy(filter)}
+                _apply_update(document, update, inserted=True)
+                self.documents.append(document)
+
+    def _update_one(self, filter, update, upsert=False, **options):
+        self._update(filter, update, many=False, upsert=upsert)
+
+    def _update_many(self, filter, update, upsert=False, **options):
+        self._update(filter, update, many=True, upsert=upsert)
+
+    def to_async(self):
+        return FakeAsyncCollection(self)
+
+
+class FakeAsyncCollection:
+    """
+    AsyncCollection view of a FakeCollection, awaiting the latency instead
+    of sleeping
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        if name not in FakeCollection.OPERATIONS:
+            raise AttributeError(name)
+        operation = getattr(self.collection, f"_{name}")
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self.collection.provider._start())
+            return operation(*args, **kwargs)
+
+        return call
+
+
+class FakeDatabase:
+    """
+    In-memory stand-in for an astrapy Database
+    """
+
+    def __init__(self, latency, rng=None):
+        self.latency = latency
+        self.rng = rng
+        self.collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self.collections:
+                self.collections[name] = FakeCollection(name, self.latency, self.rng)
+            return self.collections[name]
+
+    def get_collection(self, name):
+        return self[name]
+
+    def list_collection_names(self):
+        return list(self.collections)
+
+
+def generate_test_video(path, seconds, speech_seconds=4.5, pause_seconds=1.5):
+    """
+    Write a small MP4 of the given length whose audio alternates a tone
+    ("speech") with silence, so it is cut into chunks like a recording
+    """
+    period = speech_seconds + pause_seconds
+    subprocess.run(
+        [
+            get_ffmpeg_executable(),
+            "-nostdin",
+            "-v",
+            "error",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc=size=160x120:rate=5:duration={seconds}",
+            "-f",
+            "lavfi",
+            "-i",
+            f"aevalsrc=0.5*sin(440*2*PI*t)*lt(mod(t\\,{period})\\,{speech_seconds})"
+            f":s=16000:d={seconds}",
+            "-c:v",
+            "mpeg4",
+            "-c:a",
+            "aac",
+            "-shortest",
+            path,
+        ],
+        check=True,
+    )
+    return path
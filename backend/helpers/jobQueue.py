@@ -0,0 +1,373 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+
+from helpers import telemetry
+
+DEFAULT_JOB_DB = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "jobs.sqlite3")
+)
+
+
+class JobContext:
+    """
+    Handle passed to job handlers for reporting per-stage progress
+    """
+
+    def __init__(self, queue, job_id, payload):
+        self.queue = queue
+        self.id = job_id
+        self.payload = payload
+
+    @contextmanager
+    def stage(self, name):
+        self.queue._update_stage(self.id, name, "running")
+        try:
+            with telemetry.span(name):
+                yield
+        except Exception:
+            self.queue._update_stage(self.id, name, "failed")
+            raise
+        self.queue._update_stage(self.id, name, "done")
+
+
+class NullJobContext:
+    """
+    Stand-in used when a pipeline runs inline inside the request
+    """
+
+    id = None
+
+    @contextmanager
+    def stage(self, name):
+        with telemetry.span(name):
+            yield
+
+
+class JobQueue:
+    """
+    Background job queue persisted in SQLite.
+
+    Jobs are claimed by worker threads, either embedded in the web process or
+    running in a separate `python worker.py` process that shares the same
+    database file, so web and compute workers can be sized independently.
+
+    Running jobs hold a lease that their process renews with a heartbeat.
+    A job whose lease expired, because its process died or was restarted,
+    is queued again, or failed once it has been tried max_attempts times.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_JOB_DB,
+        poll_interval=0.5,
+        retention_seconds=86400,
+        lease_seconds=60,
+        max_attempts=2,
+    ):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.handlers = {}
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._workers = []
+        self._heartbeat = None
+        # Ids of the jobs running in this process, whose leases it renews
+        self._running = set()
+        self._running_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    stages TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)"
+            )
+            # Added after the table was first released
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            if "attempts" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            path=os.getenv("JOB_DB", DEFAULT_JOB_DB),
+            retention_seconds=int(os.getenv("JOB_RETENTION_SECONDS", "86400")),
+            lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "2")),
+        )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def register(self, kind, stages=()):
+        """
+        Decorator registering a handler for a job kind. The handler is called
+        with a JobContext and must return a JSON-serializable result.
+        """
+
+        def decorator(func):
+            self.handlers[kind] = (func, list(stages))
+            return func
+
+        return decorator
+
+    def submit(self, kind, payload):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        _, stages = self.handlers[kind]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, stages, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (
+                    job_id,
+                    kind,
+                    json.dumps(payload),
+                    json.dumps([{"name": name, "status": "pending"} for name in stages]),
+                    now,
+                    now,
+                ),
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "stages": json.loads(row["stages"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "createdAt": row["created_at"],
+            "updatedAt": row["updated_at"],
+        }
+
+    def _recover_stale(self, conn):
+        """
+        Requeue running jobs whose lease expired, or fail them once they
+        have used up their attempts
+        """
+        now = time.time()
+        cutoff = now - self.lease_seconds
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? "
+            "WHERE status = 'running' AND COALESCE(heartbeat_at, updated_at) < ? "
+            "AND attempts >= ?",
+            ("The worker running the job stopped", now, cutoff, self.max_attempts),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', updated_at = ? "
+            "WHERE status = 'running' AND COALESCE(heartbeat_at, updated_at) < ?",
+            (now, cutoff),
+        )
+
+    def recover_stale(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._recover_stale(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _claim(self):
+        """
+        Atomically move the oldest queued job to running, first requeueing
+        jobs whose worker stopped
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._recover_stale(conn)
+                placeholders = ",".join("?" for _ in self.handlers)
+                row = conn.execute(
+                    f"SELECT id, kind, payload FROM jobs WHERE status = 'queued' "
+                    f"AND kind IN ({placeholders}) ORDER BY created_at LIMIT 1",
+                    list(self.handlers),
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', heartbeat_at = ?, "
+                        "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (now, now, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def _update_stage(self, job_id, name, status):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT stages FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                stages = json.loads(row["stages"])
+                for stage in stages:
+                    if stage["name"] == name:
+                        break
+                else:
+                    stage = {"name": name}
+                    stages.append(stage)
+                stage["status"] = status
+                stage[f"{status}At"] = time.time()
+                conn.execute(
+                    "UPDATE jobs SET stages = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(stages), time.time(), job_id),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (
+                    status,
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def _run(self, row):
+        func, _ = self.handlers[row["kind"]]
+        try:
+            job = JobContext(self, row["id"], json.loads(row["payload"]))
+            with telemetry.traced(f"job.{row['kind']}", job=row["id"]):
+                result = func(job)
+        except Exception as e:
+            print(f"Job {row['id']} ({row['kind']}) failed: {e}")
+            traceback.print_exc()
+            self._finish(row["id"], "failed", error=str(e))
+            return
+
+        try:
+            self._finish(row["id"], "succeeded", result=result)
+        except (TypeError, ValueError) as e:
+            print(f"Job {row['id']} ({row['kind']}) returned an unserializable result: {e}")
+            self._finish(row["id"], "failed", error=f"Could not store the job result: {e}")
+
+    def _renew_leases(self):
+        while not self._stop.wait(self.lease_seconds / 4):
+            with self._running_lock:
+                running = list(self._running)
+            if not running:
+                continue
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        f"UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' "
+                        f"AND id IN ({','.join('?' for _ in running)})",
+                        [time.time(), *running],
+                    )
+            except sqlite3.Error as e:
+                print(f"Error renewing job leases: {e}")
+
+    def purge_expired(self):
+        cutoff = time.time() - self.retention_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                (cutoff,),
+            )
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                row = self._claim()
+            except sqlite3.Error as e:
+                print(f"Error claiming job: {e}")
+                row = None
+
+            if row is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            with self._running_lock:
+                self._running.add(row["id"])
+            try:
+                self._run(row)
+            except Exception as e:
+                # Keep the worker alive; if the job cannot be marked failed,
+                # its lease expires and it is retried
+                print(f"Error running job {row['id']}: {e}")
+                traceback.print_exc()
+                try:
+                    self._finish(row["id"], "failed", error=str(e))
+                except sqlite3.Error as e:
+                    print(f"Error failing job {row['id']}: {e}")
+            finally:
+                with self._running_lock:
+                    self._running.discard(row["id"])
+
+    def start_workers(self, count):
+        """
+        Start count daemon worker threads in this process, after requeueing
+        the jobs orphaned by stopped workers
+        """
+        self.purge_expired()
+        if not count:
+            return
+        self.recover_stale()
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(
+                target=self._renew_leases, name="job-heartbeat", daemon=True
+            )
+            self._heartbeat.start()
+        for i in range(count):
+            worker = threading.Thread(
+                target=self._worker_loop, name=f"job-worker-{i}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
@@ -0,0 +1,122 @@
+import asyncio
+
+import numpy as np
+from nltk.translate.bleu_score import SmoothingFunction, sentence_bleu
+from rouge_score import rouge_scorer
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from helpers.nltkData import word_tokenize
+
+
+class BatchMetricsEngine:
+    """
+    Scores every language of a submission in one pass: each distinct text is
+    tokenized once, and every candidate/ground-truth pair is vectorized into
+    character 3-gram counts by one stateless hashing vectorizer. The cosine
+    similarities come out of sparse row-wise products, with each pair
+    weighted as a TF-IDF vectorizer fitted on that pair alone would weight
+    it, so a language's score does not depend on the others in the batch.
+    """
+
+    # Smoothed IDF of a term found in one of a pair's two texts; terms found
+    # in both get an IDF of 1
+    PAIR_IDF = 1 + np.log(3 / 2)
+
+    def __init__(self):
+        self.scorer = rouge_scorer.RougeScorer(
+            ["rouge1", "rouge2", "rougeL"], use_stemmer=True
+        )
+        self.smoothie = SmoothingFunction().method1
+        # Character-level n-grams handle non-English text better
+        self.vectorizer = HashingVectorizer(
+            analyzer="char", ngram_range=(3, 3), alternate_sign=False, norm=None
+        )
+
+    def cosine_similarities(self, pairs):
+        """
+        Cosine similarity for each (candidate, ground_truth) pair, None where
+        the ground truth is missing
+        """
+        similarities = [None] * len(pairs)
+        present = [i for i, (_, truth) in enumerate(pairs) if truth]
+        if not present:
+            return similarities
+
+        candidates = self.vectorizer.transform([pairs[i][0].lower() for i in present])
+        truths = self.vectorizer.transform([pairs[i][1].lower() for i in present])
+
+        def row_sums(matrix):
+            return np.asarray(matrix.sum(axis=1)).ravel()
+
+        # Only terms in both texts count towards the dot product, and their
+        # IDF is 1; terms in one text only are up-weighted by PAIR_IDF in
+        # the norms
+        dots = row_sums(candidates.multiply(truths))
+        idf_squared = self.PAIR_IDF**2
+
+        def squared_norms(counts, other):
+            squares = counts.multiply(counts)
+            shared = row_sums(squares.multiply(other > 0))
+            return idf_squared * row_sums(squares) - (idf_squared - 1) * shared
+
+        norms = np.sqrt(squared_norms(candidates, truths) * squared_norms(truths, candidates))
+        for i, dot, norm in zip(present, dots, norms):
+            # Texts shorter than an n-gram have no terms
+            similarities[i] = float(dot / norm) if norm else 0.0
+        return similarities
+
+    def score(self, items):
+        """
+        Score a batch of dicts with original, translated, ground_truth and
+        back_translation texts, returning one metrics dict (or None if the
+        item could not be scored) per item
+        """
+        tokens = {}
+
+        def tokenize(text):
+            key = text.lower()
+            if key not in tokens:
+                tokens[key] = word_tokenize(key)
+            return tokens[key]
+
+        cosines = self.cosine_similarities(
+            [(item["translated"], item.get("ground_truth")) for item in items]
+        )
+
+        results = []
+        for item, cosine in zip(items, cosines):
+            original = item["original"]
+            back_translation = item["back_translation"]
+
+            try:
+                # BLEU with smoothing and equal weights for 1-4 grams
+                bleu_score = sentence_bleu(
+                    [tokenize(original)],
+                    tokenize(back_translation),
+                    weights=(0.25, 0.25, 0.25, 0.25),
+                    smoothing_function=self.smoothie,
+                )
+                rouge_scores = self.scorer.score(original, back_translation)
+            except Exception as e:
+                # Keep failures per item so one bad text does not fail the batch
+                print(f"Error calculating metrics: {e}")
+                results.append(None)
+                continue
+
+            results.append(
+                {
+                    "bleu": bleu_score,
+                    "rouge1": rouge_scores["rouge1"].fmeasure,
+                    "rouge2": rouge_scores["rouge2"].fmeasure,
+                    "rougeL": rouge_scores["rougeL"].fmeasure,
+                    "cosine_similarity_with_ground_truth": cosine,
+                }
+            )
+        return results
+
+    async def score_async(self, items):
+        """
+        Score a batch on the default executor so the event loop stays free
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.score, items)
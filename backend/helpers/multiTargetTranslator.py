@@ -0,0 +1,175 @@
+import asyncio
+import json
+import math
+import os
+
+from helpers import telemetry
+from helpers.batchTranslator import CODE_FENCE
+from helpers.textChunker import join_chunks, split_into_chunks
+
+# Estimated translation characters one multi-target response may hold before
+# the languages are split over several prompts
+MULTI_TARGET_MAX_OUTPUT_CHARS = int(os.getenv("MULTI_TARGET_MAX_OUTPUT_CHARS", "12000"))
+# Translations into Indic scripts run longer than their English source
+MULTI_TARGET_EXPANSION = float(os.getenv("MULTI_TARGET_EXPANSION", "1.5"))
+
+
+def group_languages(text, languages):
+    """
+    Split languages into groups whose combined translations of text are
+    expected to fit in one response
+    """
+    per_language = max(1, math.ceil(len(text) * MULTI_TARGET_EXPANSION))
+    size = max(1, MULTI_TARGET_MAX_OUTPUT_CHARS // per_language)
+    return [languages[start : start + size] for start in range(0, len(languages), size)]
+
+
+def _multi_target_prompt(text, languages):
+    return f"""
+        Translate the following text to each of these languages: {", ".join(languages)}.
+
+        {text}
+
+        Respond with only a JSON object mapping each language name to its
+        translation, without any additional comments.
+        """
+
+
+def _generation_config(languages):
+    # Passed to the Gemini GenerationConfig proto, whose Schema spells its
+    # type field type_
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": {
+            "type_": "OBJECT",
+            "properties": {language: {"type_": "STRING"} for language in languages},
+            "required": list(languages),
+        },
+    }
+
+
+def parse_multi_target_response(content, languages):
+    """
+    Parse a multi-target response into {language: translation} for the
+    languages it holds a non-empty string for, or None unless it is a JSON
+    object
+    """
+    try:
+        translations = json.loads(CODE_FENCE.sub("", content.strip()))
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    if not isinstance(translations, dict):
+        return None
+    return {
+        language: translations[language]
+        for language in languages
+        if isinstance(translations.get(language), str) and translations[language].strip()
+    }
+
+
+class MultiTargetTranslator:
+    """
+    Translates one text into several languages with a single structured
+    Gemini response per group of languages, so the source text is sent once
+    per group rather than once per language
+    """
+
+    def __init__(self, translator):
+        self.translator = translator
+
+    async def _translate_group(self, text, languages):
+        """
+        Translate a chunk into a group of languages, returning {language:
+        translation or exception}. A response that cannot be parsed, e.g.
+        because it was cut off, is retried as two smaller groups; languages
+        still missing fall back to one prompt each.
+        """
+        translator = self.translator
+        prompt = _multi_target_prompt(text, languages)
+        try:
+            response = await translator._call(
+                "gemini",
+                lambda: translator.llm.ainvoke(
+                    prompt, generation_config=_generation_config(languages)
+                ),
+            )
+        except Exception as e:
+            return {language: e for language in languages}
+        telemetry.record_llm_usage(translator.GEMINI_MODEL, response)
+
+        translations = parse_multi_target_response(response.content, languages)
+        if translations is None and len(languages) > 1:
+            print(
+                f"Multi-target response for {len(languages)} languages could not be parsed, "
+                "splitting"
+            )
+            middle = len(languages) // 2
+            halves = await asyncio.gather(
+                self._translate_group(text, languages[:middle]),
+                self._translate_group(text, languages[middle:]),
+            )
+            return {**halves[0], **halves[1]}
+
+        results = {}
+        for language, translation in (translations or {}).items():
+            await translator.cache.set_async(
+                text, language, "gemini", translator.GEMINI_CACHE_VERSION, translation
+            )
+            results[language] = translation
+
+        missing = [language for language in languages if language not in results]
+        if missing:
+            print(f"Multi-target response missed {', '.join(missing)}, translating one by one")
+            fallbacks = await asyncio.gather(
+                *[translator._gemini_translate_chunk(text, language) for language in missing],
+                return_exceptions=True,
+            )
+            results.update(zip(missing, fallbacks))
+        return results
+
+    async def _translate_chunk(self, text, languages):
+        cache = self.translator.cache
+        results = {}
+        missing = []
+        for language in languages:
+            cached = await cache.get_async(
+                text, language, "gemini", self.translator.GEMINI_CACHE_VERSION
+            )
+            if cached is not None:
+                results[language] = cached
+            else:
+                missing.append(language)
+
+        for group in await asyncio.gather(
+            *[self._translate_group(text, group) for group in group_languages(text, missing)]
+        ):
+            results.update(group)
+        return results
+
+    async def translate(self, text, languages):
+        """
+        Translate text into every language, returning {language: translation
+        or the exception that language failed with}. Long texts are chunked
+        as in translate_text_async, and each chunk is cached per language.
+        """
+        languages = list(languages)
+        chunks = split_into_chunks(text, max_chars=self.translator.chunk_chars)
+        if len(chunks) <= 1:
+            chunks = [(text, "")]
+
+        with telemetry.span("translate", languages=len(languages), multi_target=True):
+            translated = await asyncio.gather(
+                *[self._translate_chunk(chunk, languages) for chunk, _ in chunks]
+            )
+
+        results = {}
+        for language in languages:
+            parts = [chunk_results[language] for chunk_results in translated]
+            error = next((part for part in parts if isinstance(part, Exception)), None)
+            if error is not None:
+                results[language] = error
+            elif len(chunks) == 1:
+                results[language] = parts[0]
+            else:
+                results[language] = join_chunks(parts, chunks)
+        return results
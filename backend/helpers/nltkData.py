@@ -0,0 +1,45 @@
+import os
+import re
+import threading
+
+# Optional bundled data directory, populated with
+# `python -m nltk.downloader -d backend/nltk_data punkt_tab`
+BUNDLED_NLTK_DATA = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "nltk_data")
+)
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_punkt_available = None
+_lock = threading.Lock()
+
+
+def punkt_available():
+    """
+    Check once, without touching the network, whether the punkt tokenizer
+    data is installed
+    """
+    global _punkt_available
+    with _lock:
+        if _punkt_available is None:
+            import nltk
+
+            if os.path.isdir(BUNDLED_NLTK_DATA) and BUNDLED_NLTK_DATA not in nltk.data.path:
+                nltk.data.path.insert(0, BUNDLED_NLTK_DATA)
+            try:
+                nltk.data.find("tokenizers/punkt_tab/english/")
+                _punkt_available = True
+            except LookupError:
+                print(
+                    "NLTK punkt_tab data not found, falling back to a regex tokenizer. "
+                    "Run `python -m nltk.downloader -d backend/nltk_data punkt_tab` to install it."
+                )
+                _punkt_available = False
+        return _punkt_available
+
+
+def word_tokenize(text):
+    if punkt_available():
+        import nltk
+
+        return nltk.word_tokenize(text)
+    return TOKEN_PATTERN.findall(text)
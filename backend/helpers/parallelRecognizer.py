@@ -0,0 +1,69 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+from helpers import clients
+from helpers.resilience import CircuitOpenError
+
+# Markers left in the transcript so gaps are visible instead of silently dropped
+UNINTELLIGIBLE_MARKER = "[inaudible]"
+FAILED_MARKER = "[transcription unavailable]"
+
+
+class ParallelRecognizer:
+    """
+    Recognize audio chunks on a bounded thread pool, returning the results in
+    the original chunk order
+    """
+
+    def __init__(self, recognize, max_workers=8, policy=None):
+        self.recognize = recognize
+        self.max_workers = max_workers
+        # Rate limit, retries and circuit breaker shared by every transcription
+        self.policy = policy or clients.get_provider_policy("speech")
+
+    def _recognize_chunk(self, index, audio_data):
+        def recognize():
+            # Unintelligible audio is a result, not a service failure
+            try:
+                return self.recognize(audio_data)
+            except sr.UnknownValueError:
+                return None
+
+        try:
+            text = self.policy.call_sync(
+                recognize, retry_if=lambda error: isinstance(error, sr.RequestError)
+            )
+        except (sr.RequestError, CircuitOpenError) as e:
+            print(
+                f"Could not request results from speech recognition service in chunk {index}; {e}"
+            )
+            return FAILED_MARKER
+
+        if text is None:
+            print(f"Could not understand audio in chunk {index}")
+            return UNINTELLIGIBLE_MARKER
+        return text
+
+    def recognize_all(self, chunks):
+        """
+        Recognize an iterable of chunks, yielding texts in order. At most
+        twice max_workers chunks are held in memory at a time, so a streaming
+        chunk source keeps constant memory.
+        """
+        in_flight = deque()
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="speech"
+        ) as executor:
+            for index, chunk in enumerate(chunks):
+                in_flight.append(executor.submit(self._recognize_chunk, index, chunk))
+                if len(in_flight) >= self.max_workers * 2:
+                    yield in_flight.popleft().result()
+
+            while in_flight:
+                yield in_flight.popleft().result()
+
+    def transcribe(self, chunks):
+        texts = [text for text in self.recognize_all(chunks) if text]
+        return " ".join(texts).strip()
@@ -0,0 +1,227 @@
+import asyncio
+import atexit
+import contextvars
+import functools
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from astrapy.exceptions import DataAPIResponseException
+
+from helpers.clients import get_async_collection
+from helpers.eventLoop import get_loop
+
+# "sync" waits for storage before responding, "write-behind" responds first
+WRITE_MODE = os.getenv("STORAGE_WRITE_MODE", "sync")
+MAX_CONCURRENCY = int(os.getenv("STORAGE_MAX_CONCURRENCY", "8"))
+WRITE_BEHIND_RETRIES = int(os.getenv("STORAGE_WRITE_RETRIES", "3"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_CONCURRENCY, thread_name_prefix="storage"
+            )
+        return _executor
+
+
+class UnitOfWork:
+    """
+    Collects the rows and updates of a submission and writes them in as few
+    AstraDB round trips as possible: one insert_many per collection, with
+    every collection and update written concurrently.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.inserts = {}
+        self.updates = []
+        self._after_commit = []
+
+    def insert(self, collection, row):
+        # Rows with an id are stored under it, so an insert that is retried
+        # after it landed cannot store them twice
+        if "id" in row and "_id" not in row:
+            row = {"_id": row["id"], **row}
+        self.inserts.setdefault(collection, []).append(row)
+
+    def update(self, collection, filter, update, **options):
+        self.updates.append(("update_one", collection, filter, update, options))
+
+    def update_many(self, collection, filter, update):
+        self.updates.append(("update_many", collection, filter, update, {}))
+
+    def on_commit(self, callback):
+        """
+        Call callback() once the writes have landed, e.g. to queue work that
+        reads the stored rows
+        """
+        self._after_commit.append(callback)
+
+    def _operations(self, collection_for):
+        operations = []
+        for name, rows in self.inserts.items():
+            operations.append((collection_for(name).insert_many, (rows,)))
+        for method_name, name, filter, update, options in self.updates:
+            method = getattr(collection_for(name), method_name)
+            if options:
+                method = functools.partial(method, **options)
+            operations.append((method, (filter, update)))
+        return operations
+
+    def run_callbacks(self):
+        for callback in self._after_commit:
+            callback()
+
+    async def run_callbacks_async(self):
+        """
+        run_callbacks() for coroutines, on the storage executor since the
+        callbacks may block, e.g. on the job queue's SQLite insert
+        """
+        await asyncio.get_running_loop().run_in_executor(
+            _get_executor(), contextvars.copy_context().run, self.run_callbacks
+        )
+
+    def commit(self):
+        """
+        Write everything with the sync collections and run the callbacks
+        """
+        operations = self._operations(lambda name: self.db[name])
+        if len(operations) == 1:
+            method, args = operations[0]
+            method(*args)
+        elif operations:
+            # Each write runs in the caller's context, so it joins its trace
+            futures = [
+                _get_executor().submit(contextvars.copy_context().run, method, *args)
+                for method, args in operations
+            ]
+            for future in futures:
+                future.result()
+        self.run_callbacks()
+
+    def async_operations(self):
+        return self._operations(lambda name: get_async_collection(self.db, name))
+
+    async def commit_async(self):
+        """
+        Write everything with astrapy's async collections and run the
+        callbacks
+        """
+        await asyncio.gather(*[method(*args) for method, args in self.async_operations()])
+        await self.run_callbacks_async()
+
+
+class WriteBehindWriter:
+    """
+    Commits units of work on the shared event loop so responses do not wait
+    on storage. Failed commits are retried with jittered backoff and
+    then logged; writes still queued when the process dies are lost.
+    """
+
+    def __init__(self, max_retries=WRITE_BEHIND_RETRIES, backoff_seconds=0.5):
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._loop = get_loop()
+
+    def submit(self, unit):
+        future = asyncio.run_coroutine_threadsafe(self._commit(unit), self._loop)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def flush(self, timeout=None):
+        """
+        Wait until every submitted unit has been committed or given up on
+        """
+        with self._pending_lock:
+            pending = list(self._pending)
+        _, not_done = wait(pending, timeout)
+        return not not_done
+
+    async def _commit(self, unit):
+        # Only operations that failed are retried. A failed insert_many may
+        # still have stored some or all of its rows, so its retry inserts
+        # the whole batch again; rows already stored are rejected by their
+        # _id and count as written.
+        operations = unit.async_operations()
+        for attempt in range(self.max_retries + 1):
+            results = await asyncio.gather(
+                *[method(*args) for method, args in operations], return_exceptions=True
+            )
+            failed = [
+                (operation, result)
+                for operation, result in zip(operations, results)
+                if isinstance(result, Exception) and not _already_inserted(result)
+            ]
+            if not failed:
+                break
+            if attempt == self.max_retries:
+                print(f"Error writing behind after {attempt + 1} attempts: {failed[0][1]}")
+                return
+            operations = [operation for operation, _ in failed]
+            delay = self.backoff_seconds * 2**attempt
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+        try:
+            await unit.run_callbacks_async()
+        except Exception as e:
+            print(f"Error running write-behind callbacks: {e}")
+
+
+def _already_inserted(error):
+    """
+    Whether error only reports documents whose _id is already stored
+    """
+    if not isinstance(error, DataAPIResponseException) or not error.error_descriptors:
+        return False
+    return all(
+        descriptor.error_code == "DOCUMENT_ALREADY_EXISTS"
+        for descriptor in error.error_descriptors
+    )
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_write_behind_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindWriter()
+            # Give queued writes a chance to land when the process exits
+            atexit.register(_writer.flush, 30)
+        return _writer
+
+
+def save(unit, write_mode=None):
+    """
+    Commit a unit of work now, or hand it to the write-behind writer
+    """
+    if (write_mode or WRITE_MODE) == "write-behind":
+        get_write_behind_writer().submit(unit)
+    else:
+        unit.commit()
+
+
+async def save_async(unit, write_mode=None):
+    """
+    save() for coroutines, writing through astrapy's async collections
+    """
+    if (write_mode or WRITE_MODE) == "write-behind":
+        get_write_behind_writer().submit(unit)
+    else:
+        await unit.commit_async()
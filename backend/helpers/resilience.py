@@ -0,0 +1,280 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from helpers import telemetry
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a provider whose circuit breaker is open, so
+    callers switch to their fallback without waiting on a failing provider
+    """
+
+
+class TokenBucket:
+    """
+    Allows rate calls per second on average, in bursts of up to burst calls.
+    A rate of 0 disables the limit. Thread-safe, and shared by sync and
+    async callers.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token, returning how many seconds to wait before using it.
+        Tokens may go into debt, so waiting callers are served in order.
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures. Once open, calls are
+    refused for reset_seconds, then a single trial call is let through:
+    its success closes the breaker and its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return "open"
+            return "half-open"
+
+    def allow(self):
+        if not self.failure_threshold:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            # A trial that never reported back (e.g. was cancelled) expires
+            trial = self._trial_started
+            if trial is not None and now - trial < self.reset_seconds:
+                return False
+            self._trial_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_started is not None or (
+                self.failure_threshold and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+            self._trial_started = None
+
+
+class ProviderPolicy:
+    """
+    Resilience policy for one outbound provider: a token-bucket rate limit,
+    retries with jittered exponential backoff, an optional hedged second
+    request for slow calls, and a circuit breaker.
+
+    Calls take a factory rather than a coroutine, since retries and hedges
+    need a fresh call each time.
+    """
+
+    def __init__(
+        self,
+        name,
+        rate=0.0,
+        burst=None,
+        max_retries=2,
+        backoff_seconds=0.5,
+        max_backoff_seconds=10.0,
+        hedge_after_seconds=0.0,
+        failure_threshold=5,
+        reset_seconds=30.0,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self._stats = defaultdict(int)
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name, **defaults):
+        """
+        Read the policy of provider name from {NAME}_RATE_LIMIT,
+        {NAME}_BURST, {NAME}_MAX_RETRIES, {NAME}_HEDGE_AFTER,
+        {NAME}_BREAKER_FAILURES and {NAME}_BREAKER_RESET
+        """
+        prefix = name.upper()
+        options = {
+            "rate": ("RATE_LIMIT", float),
+            "burst": ("BURST", float),
+            "max_retries": ("MAX_RETRIES", int),
+            "hedge_after_seconds": ("HEDGE_AFTER", float),
+            "failure_threshold": ("BREAKER_FAILURES", int),
+            "reset_seconds": ("BREAKER_RESET", float),
+        }
+        for option, (suffix, parse) in options.items():
+            value = os.getenv(f"{prefix}_{suffix}")
+            if value:
+                defaults[option] = parse(value)
+        return cls(name, **defaults)
+
+    def _record(self, counter):
+        with self._stats_lock:
+            self._stats[counter] += 1
+        telemetry.PROVIDER_EVENTS.inc(provider=self.name, event=counter)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            "calls": stats.get("calls", 0),
+            "failures": stats.get("failures", 0),
+            "retries": stats.get("retries", 0),
+            "hedges": stats.get("hedges", 0),
+            "hedge_wins": stats.get("hedge_wins", 0),
+            "short_circuits": stats.get("short_circuits", 0),
+            "breaker": self.breaker.state,
+        }
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self._record("short_circuits")
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_seconds * 2**attempt, self.max_backoff_seconds)
+        return delay * random.uniform(0.5, 1.5)
+
+    def _should_retry(self, attempt, retry_if, error):
+        return (
+            attempt < self.max_retries
+            and self.breaker.state == "closed"
+            and (retry_if is None or retry_if(error))
+        )
+
+    async def _hedged(self, factory):
+        primary = asyncio.ensure_future(factory())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after_seconds)
+            if done:
+                return primary.result()
+
+            # Hedges count against the rate limit like any other call
+            await self.bucket.acquire()
+            self._record("hedges")
+            hedge = asyncio.ensure_future(factory())
+            tasks.add(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._record("hedge_wins")
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(self, factory, retry_if=None, hedge=True):
+        """
+        Await factory() under the policy. retry_if(error) can veto a retry,
+        e.g. once a stream has produced output; hedge=False disables hedging
+        for calls that are not safe to duplicate.
+        """
+        self._record("calls")
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            await self.bucket.acquire()
+            try:
+                with telemetry.span(f"provider.{self.name}", attempt=attempt):
+                    if hedge and self.hedge_after_seconds:
+                        result = await self._hedged(factory)
+                    else:
+                        result = await factory()
+            except Exception as e:
+                self.breaker.record_failure()
+                self._record("failures")
+                if not self._should_retry(attempt, retry_if, e):
+                    raise
+                self._record("retries")
+                print(f"Retrying {self.name} call after error: {e}")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            self.breaker.record_success()
+            return result
+
+    def call_sync(self, fn, retry_if=None):
+        """
+        call() for blocking provider calls, without hedging
+        """
+        self._record("calls")
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            self.bucket.acquire_sync()
+            try:
+                with telemetry.span(f"provider.{self.name}", attempt=attempt):
+                    result = fn()
+            except Exception as e:
+                self.breaker.record_failure()
+                self._record("failures")
+                if not self._should_retry(attempt, retry_if, e):
+                    raise
+                self._record("retries")
+                print(f"Retrying {self.name} call after error: {e}")
+                time.sleep(self._backoff(attempt))
+                continue
+            self.breaker.record_success()
+            return result
@@ -0,0 +1,208 @@
+import json
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from helpers import clients
+from helpers.parallelRecognizer import ParallelRecognizer, UNINTELLIGIBLE_MARKER
+
+
+class SpeechBackend:
+    """
+    Turns an iterable of in-memory sr.AudioData chunks into a transcript
+    """
+
+    name = None
+
+    def transcribe(self, chunks):
+        raise NotImplementedError
+
+
+class GoogleWebSpeechBackend(SpeechBackend):
+    """
+    Free Google Web Speech endpoint, called from a bounded thread pool
+    """
+
+    name = "google"
+
+    def __init__(self, max_workers=8):
+        self.recognizer = clients.get_recognizer()
+        self.max_workers = max_workers
+
+    def transcribe(self, chunks):
+        recognizer = ParallelRecognizer(
+            self.recognizer.recognize_google, max_workers=self.max_workers
+        )
+        return recognizer.transcribe(chunks)
+
+
+# Model loaded once per pool process by _init_worker
+_worker_engine = None
+
+
+def _init_worker(engine_cls, options):
+    global _worker_engine
+    _worker_engine = engine_cls(**options)
+
+
+def _recognize_batch(batch):
+    return [_worker_engine.recognize(frame_data, sample_rate) for frame_data, sample_rate in batch]
+
+
+class VoskEngine:
+    name = "vosk"
+
+    def __init__(self, model_path):
+        try:
+            from vosk import Model, SetLogLevel
+        except ImportError as e:
+            raise ImportError(
+                "The vosk speech backend requires `pip install vosk`"
+            ) from e
+
+        SetLogLevel(-1)
+        self.model = Model(model_path)
+
+    def recognize(self, frame_data, sample_rate):
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(self.model, sample_rate)
+        recognizer.AcceptWaveform(frame_data)
+        return json.loads(recognizer.FinalResult()).get("text", "")
+
+
+class FasterWhisperEngine:
+    name = "faster-whisper"
+
+    def __init__(self, model_size, compute_type, language):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError(
+                "The faster-whisper speech backend requires `pip install faster-whisper`"
+            ) from e
+
+        # One inference thread per process; parallelism comes from the pool
+        self.model = WhisperModel(
+            model_size, device="cpu", compute_type=compute_type, cpu_threads=1
+        )
+        self.language = language
+
+    def recognize(self, frame_data, sample_rate):
+        import numpy as np
+
+        audio = np.frombuffer(frame_data, dtype="<i2").astype(np.float32) / 32768.0
+        segments, _ = self.model.transcribe(
+            audio, language=self.language, beam_size=1
+        )
+        return " ".join(segment.text.strip() for segment in segments)
+
+
+class LocalSpeechBackend(SpeechBackend):
+    """
+    Runs a CPU speech engine in a process pool, sending chunks in batches so
+    throughput scales with local cores instead of a third-party quota
+    """
+
+    def __init__(self, engine_cls, engine_options, processes=None, batch_size=4):
+        # Spans and metrics are labelled with the engine, e.g. "vosk"
+        self.name = engine_cls.name
+        self.engine_cls = engine_cls
+        self.engine_options = engine_options
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.engine_cls, self.engine_options),
+                )
+            return self._executor
+
+    def _batches(self, chunks):
+        batch = []
+        for chunk in chunks:
+            batch.append((chunk.frame_data, chunk.sample_rate))
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def transcribe(self, chunks):
+        texts = []
+        in_flight = deque()
+
+        def collect(future):
+            for text in future.result():
+                texts.append(text.strip() or UNINTELLIGIBLE_MARKER)
+
+        for batch in self._batches(chunks):
+            in_flight.append(self.executor.submit(_recognize_batch, batch))
+            # Bound the number of batches held in memory
+            if len(in_flight) >= self.processes * 2:
+                collect(in_flight.popleft())
+        while in_flight:
+            collect(in_flight.popleft())
+
+        return " ".join(texts).strip()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+def _build_backend(name):
+    processes = int(os.getenv("SPEECH_PROCESSES", "0")) or None
+    batch_size = int(os.getenv("SPEECH_BATCH_SIZE", "4"))
+
+    if name == "google":
+        return GoogleWebSpeechBackend(
+            max_workers=int(os.getenv("SPEECH_MAX_WORKERS", "8"))
+        )
+    if name == "vosk":
+        model_path = os.getenv("VOSK_MODEL_PATH")
+        if not model_path:
+            raise ValueError("VOSK_MODEL_PATH must be set for the vosk speech backend.")
+        return LocalSpeechBackend(
+            VoskEngine, {"model_path": model_path}, processes, batch_size
+        )
+    if name == "faster-whisper":
+        return LocalSpeechBackend(
+            FasterWhisperEngine,
+            {
+                "model_size": os.getenv("WHISPER_MODEL", "base.en"),
+                "compute_type": os.getenv("WHISPER_COMPUTE_TYPE", "int8"),
+                "language": os.getenv("WHISPER_LANGUAGE", "en"),
+            },
+            processes,
+            batch_size,
+        )
+    raise ValueError(f"Unknown speech backend: {name}")
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_speech_backend(name=None):
+    """
+    Return the shared speech backend selected by name or SPEECH_BACKEND, so
+    process pools and loaded models are reused across requests
+    """
+    name = name or os.getenv("SPEECH_BACKEND", "google")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = _build_backend(name)
+        return _backends[name]
@@ -0,0 +1,417 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Requests and jobs slower than this log their trace as one JSON line;
+# set it to 0 to disable
+SLOW_TRACE_SECONDS = float(os.getenv("TRACE_SLOW_SECONDS", "5"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """
+    Monotonic counter, one value per combination of label values
+    """
+
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_label_text(self.labels, key)} {value}"
+
+
+class Histogram:
+    """
+    Latency histogram with cumulative buckets, one per combination of label
+    values
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            counts, count, total = self._values.get(key, ([0] * len(self.buckets), 0, 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, count + 1, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), count, total))
+                for key, (counts, count, total) in self._values.items()
+            )
+        bucket_labels = self.labels + ("le",)
+        for key, (counts, count, total) in values:
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts + [count]):
+                yield f"{self.name}_bucket{_label_text(bucket_labels, key + (bound,))} {bucket_count}"
+            yield f"{self.name}_sum{_label_text(self.labels, key)} {total}"
+            yield f"{self.name}_count{_label_text(self.labels, key)} {count}"
+
+
+class Registry:
+    """
+    Process-wide metrics, rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "bhasha_stage_seconds", "Time spent in each pipeline stage.", ["stage"]
+)
+STAGE_ERRORS = registry.counter(
+    "bhasha_stage_errors_total", "Pipeline stages that raised.", ["stage"]
+)
+HTTP_SECONDS = registry.histogram(
+    "bhasha_http_request_seconds",
+    "Time to respond to HTTP requests, up to the first byte of streamed responses.",
+    ["method", "endpoint", "status"],
+)
+PROVIDER_EVENTS = registry.counter(
+    "bhasha_provider_events_total",
+    "Outbound provider calls, failures, retries, hedges and short circuits.",
+    ["provider", "event"],
+)
+LLM_TOKENS = registry.counter(
+    "bhasha_llm_tokens_total", "Tokens used by LLM calls.", ["model", "type"]
+)
+
+
+class Trace:
+    """
+    Spans recorded while handling one request or job, including those of
+    tasks it runs on the shared event loop
+    """
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def totals(self):
+        """
+        Seconds per stage, summed over its spans (concurrent spans overlap)
+        """
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span["name"]] = totals.get(span["name"], 0.0) + span["seconds"]
+        return totals
+
+    def to_dict(self, **attributes):
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace": self.id,
+            "name": self.name,
+            "seconds": round(time.perf_counter() - self.started, 4),
+            **attributes,
+            "spans": spans,
+        }
+
+
+_trace = contextvars.ContextVar("trace", default=None)
+_parent_span = contextvars.ContextVar("parent_span", default=None)
+
+
+def current_trace():
+    return _trace.get()
+
+
+def start_trace(name):
+    """
+    Make a new trace current in this context and return it. Tasks and
+    threads started from the context with a copy of it share the trace.
+    """
+    trace = Trace(name)
+    _trace.set(trace)
+    _parent_span.set(None)
+    return trace
+
+
+_trace_listeners = []
+
+
+def add_trace_listener(callback):
+    """
+    Call callback(trace) whenever a trace ends, e.g. to collect per-stage
+    timings in a benchmark
+    """
+    _trace_listeners.append(callback)
+
+
+def remove_trace_listener(callback):
+    _trace_listeners.remove(callback)
+
+
+def end_trace(trace, **attributes):
+    """
+    Detach the trace from this context, logging it if it was slow
+    """
+    _trace.set(None)
+    for callback in list(_trace_listeners):
+        callback(trace)
+    seconds = time.perf_counter() - trace.started
+    if SLOW_TRACE_SECONDS and seconds >= SLOW_TRACE_SECONDS:
+        print(json.dumps({"slow_trace": trace.to_dict(**attributes)}, default=str))
+
+
+@contextmanager
+def traced(name, **attributes):
+    """
+    Run the block as its own trace, e.g. a background job
+    """
+    trace = start_trace(name)
+    try:
+        yield trace
+    finally:
+        end_trace(trace, **attributes)
+
+
+def _record_span(trace, name, span_id, parent, start, error, attributes):
+    seconds = time.perf_counter() - start
+    STAGE_SECONDS.observe(seconds, stage=name)
+    if error is not None:
+        STAGE_ERRORS.inc(stage=name)
+    if trace is None:
+        return
+    record = {
+        "name": name,
+        "id": span_id,
+        "parent": parent,
+        "offset": round(start - trace.started, 4),
+        "seconds": round(seconds, 4),
+    }
+    if attributes:
+        record["attributes"] = attributes
+    if error is not None:
+        record["error"] = repr(error)
+    trace.add(record)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a stage: its duration goes to the stage histogram and, inside a
+    trace, is recorded as a span with its attributes and parent
+    """
+    trace = _trace.get()
+    span_id = uuid.uuid4().hex[:16]
+    parent = _parent_span.get()
+    token = _parent_span.set(span_id)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        _parent_span.reset(token)
+        _record_span(trace, name, span_id, parent, start, error, attributes)
+
+
+def record_span(name, start, error=None, **attributes):
+    """
+    Record a stage that started at start (a time.perf_counter() value) and
+    has just ended, for stages span() cannot wrap, such as one spread over
+    the iterations of a generator. It is not the parent of spans started
+    meanwhile.
+    """
+    _record_span(
+        _trace.get(), name, uuid.uuid4().hex[:16], _parent_span.get(), start, error, attributes
+    )
+
+
+def record_llm_usage(model, message):
+    """
+    Count the tokens of an LLM response or streamed chunk that carries
+    usage_metadata
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], model=model, type=kind.split("_")[0])
+
+
+def server_timing(trace):
+    """
+    Server-Timing header value with the time spent per stage
+    """
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.1f}"
+        for name, seconds in sorted(trace.totals().items(), key=lambda item: -item[1])
+    )
+
+
+class TracedCollection:
+    """
+    Times every data operation of an astrapy collection as a
+    db.<collection>.<operation> stage
+    """
+
+    OPERATIONS = {
+        "find_one",
+        "insert_one",
+        "insert_many",
+        "update_one",
+        "update_many",
+        "delete_one",
+        "delete_many",
+        "find_one_and_update",
+        "count_documents",
+        "distinct",
+    }
+
+    def __init__(self, collection, name):
+        self._collection = collection
+        self._name = name
+
+    def __getattr__(self, attribute):
+        value = getattr(self._collection, attribute)
+        if attribute == "find":
+            return self._find
+        if attribute not in self.OPERATIONS:
+            return value
+
+        def operation(*args, **kwargs):
+            with span(f"db.{self._name}.{attribute}"):
+                return value(*args, **kwargs)
+
+        return operation
+
+    def _find(self, *args, **kwargs):
+        # Cursors fetch lazily, so the stage covers iterating the results.
+        # A generator may be finished from another context, so it records
+        # its span without becoming the current parent.
+        trace = _trace.get()
+        parent = _parent_span.get()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield from self._collection.find(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _record_span(
+                trace, f"db.{self._name}.find", uuid.uuid4().hex[:16], parent, start, error, {}
+            )
+
+    def to_async(self, *args, **kwargs):
+        return TracedAsyncCollection(self._collection.to_async(*args, **kwargs), self._name)
+
+
+class TracedAsyncCollection:
+    """
+    TracedCollection for astrapy's AsyncCollection
+    """
+
+    def __init__(self, collection, name):
+        self._collection = collection
+        self._name = name
+
+    def __getattr__(self, attribute):
+        value = getattr(self._collection, attribute)
+        if attribute not in TracedCollection.OPERATIONS:
+            return value
+
+        async def operation(*args, **kwargs):
+            with span(f"db.{self._name}.{attribute}"):
+                return await value(*args, **kwargs)
+
+        return operation
+
+
+class TracedDatabase:
+    """
+    Database wrapper whose collections are TracedCollections
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getitem__(self, name):
+        return TracedCollection(self._db[name], name)
+
+    def get_collection(self, name, *args, **kwargs):
+        return TracedCollection(self._db.get_collection(name, *args, **kwargs), name)
+
+    def __getattr__(self, attribute):
+        return getattr(self._db, attribute)
@@ -0,0 +1,88 @@
+import re
+
+# Sentence terminators for English and the Indic scripts we translate into
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?।॥])\s+")
+PARAGRAPH_BOUNDARY = re.compile(r"\n\s*\n")
+
+
+def _split_long_paragraph(paragraph, max_chars):
+    """
+    Split a paragraph at sentence boundaries, packing sentences greedily
+    into pieces of at most max_chars
+    """
+    pieces = []
+    current = ""
+    for sentence in SENTENCE_BOUNDARY.split(paragraph):
+        # A single sentence longer than the limit is split at whitespace
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(text, max_chars=2000):
+    """
+    Split text into translation chunks of at most max_chars.
+
+    Texts that fit are returned whole, so they are translated in one call
+    with their full context. Longer texts are split at paragraph boundaries,
+    packing adjacent paragraphs greedily into each chunk; only paragraphs
+    longer than max_chars are split further, at sentence boundaries.
+
+    Returns a list of (chunk, separator) tuples where separator is the text
+    that joins the chunk to the next one when reassembling.
+    """
+    if len(text) <= max_chars:
+        return [(text, "")]
+
+    paragraphs = [p.strip() for p in PARAGRAPH_BOUNDARY.split(text.strip())]
+    paragraphs = [p for p in paragraphs if p]
+
+    chunks = []
+    current = ""
+    for paragraph in paragraphs:
+        if len(paragraph) > max_chars:
+            if current:
+                chunks.append((current, "\n\n"))
+                current = ""
+            pieces = _split_long_paragraph(paragraph, max_chars)
+            for piece in pieces[:-1]:
+                chunks.append((piece, " "))
+            chunks.append((pieces[-1], "\n\n"))
+            continue
+
+        if current and len(current) + 2 + len(paragraph) > max_chars:
+            chunks.append((current, "\n\n"))
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+
+    if current:
+        chunks.append((current, "\n\n"))
+    return chunks
+
+
+def join_chunks(translated_chunks, chunks):
+    """
+    Reassemble translated chunks using the separators of the source chunks
+    """
+    parts = []
+    for translated, (_, separator) in zip(translated_chunks, chunks):
+        parts.append(translated.strip())
+        parts.append(separator)
+    return "".join(parts[:-1])
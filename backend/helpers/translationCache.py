@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from helpers.lruCache import LRUCache
+
+DEFAULT_CACHE_DB = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "translation_cache.sqlite3")
+)
+
+
+def normalize_text(text):
+    """
+    Normalize text so that trivially different submissions share a cache key
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+def make_cache_key(text, language, provider, model):
+    text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{provider}:{model}:{language}:{text_hash}"
+
+
+class SQLiteTranslationStore:
+    """
+    Persistent cache tier backed by a local SQLite file
+    """
+
+    def __init__(self, path, ttl_seconds):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                self._conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+                self._conn.commit()
+                return False, None
+
+        return True, json.loads(value)
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            self._conn.commit()
+
+
+class TranslationCache:
+    """
+    Two-tier translation cache keyed on (normalized text hash, language,
+    provider, model/prompt version)
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, store=None):
+        self.local = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.store = store
+        self._lock = threading.Lock()
+        # In-flight fetches by event loop and key
+        self._pending = {}
+        self._stats = defaultdict(
+            lambda: {
+                "local_hits": 0,
+                "persistent_hits": 0,
+                "misses": 0,
+                "shared_fetches": 0,
+                "fetch_seconds": 0.0,
+                "saved_characters": 0,
+            }
+        )
+
+    @classmethod
+    def from_env(cls):
+        store = None
+        db_path = os.getenv("TRANSLATION_CACHE_DB", DEFAULT_CACHE_DB)
+        if db_path:
+            try:
+                store = SQLiteTranslationStore(
+                    db_path,
+                    ttl_seconds=int(
+                        os.getenv("TRANSLATION_CACHE_PERSISTENT_TTL", str(30 * 86400))
+                    ),
+                )
+            except sqlite3.Error as e:
+                print(f"Error opening translation cache at {db_path}: {e}")
+
+        return cls(
+            max_entries=int(os.getenv("TRANSLATION_CACHE_SIZE", "1024")),
+            ttl_seconds=int(os.getenv("TRANSLATION_CACHE_TTL", "3600")),
+            store=store,
+        )
+
+    def get(self, text, language, provider, model):
+        """
+        Look up a cached translation, returning None on a miss
+        """
+        key = make_cache_key(text, language, provider, model)
+        found, value = self.local.get(key)
+        if found:
+            self._record(provider, "local_hits", text)
+            return value
+        return self._get_stored(key, text, provider)
+
+    async def get_async(self, text, language, provider, model):
+        """
+        get() for coroutines, reading the persistent tier on the default
+        executor so SQLite does not block the event loop
+        """
+        key = make_cache_key(text, language, provider, model)
+        found, value = self.local.get(key)
+        if found:
+            self._record(provider, "local_hits", text)
+            return value
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._get_stored, key, text, provider
+        )
+
+    def _get_stored(self, key, text, provider):
+        if self.store is not None:
+            try:
+                found, value = self.store.get(key)
+            except sqlite3.Error as e:
+                print(f"Error reading translation cache: {e}")
+                found = False
+            if found:
+                self.local.set(key, value)
+                self._record(provider, "persistent_hits", text)
+                return value
+
+        self._record(provider, "misses")
+        return None
+
+    def set(self, text, language, provider, model, value):
+        if value is None:
+            return
+
+        key = make_cache_key(text, language, provider, model)
+        self.local.set(key, value)
+        self._store(key, value)
+
+    async def set_async(self, text, language, provider, model, value):
+        """
+        set() for coroutines, writing the persistent tier on the default
+        executor
+        """
+        if value is None:
+            return
+
+        key = make_cache_key(text, language, provider, model)
+        self.local.set(key, value)
+        if self.store is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._store, key, value)
+
+    def _store(self, key, value):
+        if self.store is not None:
+            try:
+                self.store.set(key, value)
+            except sqlite3.Error as e:
+                print(f"Error writing translation cache: {e}")
+
+    async def get_or_fetch(self, text, language, provider, model, fetch):
+        """
+        Return the cached translation or await fetch() and cache its result.
+        Concurrent misses for the same key share one fetch, so submissions of
+        the same text that overlap make a single provider call.
+        """
+        cached = await self.get_async(text, language, provider, model)
+        if cached is not None:
+            return cached
+
+        key = (asyncio.get_running_loop(), make_cache_key(text, language, provider, model))
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = asyncio.ensure_future(
+                    self._fetch(text, language, provider, model, fetch)
+                )
+                self._pending[key] = pending
+                pending.add_done_callback(lambda task: self._fetched(key, task))
+            else:
+                self._stats[provider]["shared_fetches"] += 1
+        # A cancelled caller leaves the fetch running for the others, and
+        # its result is still cached
+        return await asyncio.shield(pending)
+
+    def _fetched(self, key, task):
+        with self._lock:
+            self._pending.pop(key, None)
+        # Mark a failure as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, text, language, provider, model, fetch):
+        started = time.perf_counter()
+        value = await fetch()
+        self._record_fetch(provider, time.perf_counter() - started)
+        await self.set_async(text, language, provider, model, value)
+        return value
+
+    def get_or_fetch_sync(self, text, language, provider, model, fetch):
+        cached = self.get(text, language, provider, model)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        value = fetch()
+        self._record_fetch(provider, time.perf_counter() - started)
+        self.set(text, language, provider, model, value)
+        return value
+
+    def _record(self, provider, counter, text=None):
+        with self._lock:
+            stats = self._stats[provider]
+            stats[counter] += 1
+            if text is not None:
+                stats["saved_characters"] += len(text)
+
+    def _record_fetch(self, provider, seconds):
+        with self._lock:
+            self._stats[provider]["fetch_seconds"] += seconds
+
+    def stats(self):
+        """
+        Hit/miss counters per provider with an estimate of the latency saved
+        """
+        with self._lock:
+            result = {}
+            for provider, stats in self._stats.items():
+                hits = stats["local_hits"] + stats["persistent_hits"]
+                # Misses that joined another caller's fetch did not call out
+                fetches = stats["misses"] - stats["shared_fetches"]
+                avg_fetch = stats["fetch_seconds"] / fetches if fetches else 0.0
+                result[provider] = {
+                    **stats,
+                    "hit_ratio": hits / (hits + stats["misses"])
+                    if hits + stats["misses"]
+                    else 0.0,
+                    "estimated_saved_seconds": (hits + stats["shared_fetches"]) * avg_fetch,
+                }
+            result["local_entries"] = len(self.local)
+            return result
+
+
+translation_cache = TranslationCache.from_env()
@@ -0,0 +1,196 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+
+# Chunks are copied to disk in blocks of this size, so memory stays constant
+COPY_BLOCK_BYTES = 1024 * 1024
+
+
+class UploadError(Exception):
+    """
+    Upload protocol error, carrying the HTTP status and the offset the
+    client should resume from
+    """
+
+    def __init__(self, message, status, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class UploadStore:
+    """
+    Resumable uploads spooled to uniquely named files. Each upload is a
+    .part file plus a .json metadata file, so progress survives restarts
+    and is shared by the worker processes of a host.
+    """
+
+    def __init__(self, directory, max_bytes, expiry_seconds=86400, purge_interval=60):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.expiry_seconds = expiry_seconds
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, upload_id):
+        # Only ids minted by create() are valid, never client-chosen paths
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            raise UploadError("Upload not found", 404) from None
+        base = os.path.join(self.directory, upload_id)
+        return f"{base}.part", f"{base}.json"
+
+    def _read_meta(self, upload_id):
+        _, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError("Upload not found", 404) from None
+
+    def _write_meta(self, upload_id, meta):
+        _, meta_path = self._paths(upload_id)
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def create(self, filename, size):
+        if size <= 0 or size > self.max_bytes:
+            raise UploadError(f"Upload size must be between 1 and {self.max_bytes} bytes", 413)
+        self.purge_expired()
+
+        upload_id = str(uuid.uuid4())
+        part_path, _ = self._paths(upload_id)
+        open(part_path, "wb").close()
+        self._write_meta(
+            upload_id,
+            {"filename": filename, "size": size, "createdAt": time.time(), "jobId": None},
+        )
+        return upload_id
+
+    def status(self, upload_id):
+        meta = self._read_meta(upload_id)
+        part_path, _ = self._paths(upload_id)
+        if meta.get("path"):
+            offset = meta["size"]
+        else:
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        return {
+            "uploadId": upload_id,
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "offset": offset,
+            "complete": bool(meta.get("path")),
+            "jobId": meta.get("jobId"),
+        }
+
+    def append(self, upload_id, offset, stream, on_complete):
+        """
+        Append the stream to the upload at offset and return its status.
+        Bytes received before a dropped connection are kept, so the client
+        can resume from status()["offset"]. Once every byte has arrived the
+        file is moved to its final unique path and on_complete(path) is
+        called, e.g. to queue its transcription; its result is the jobId.
+        A chunk that overruns the declared size is dropped whole, and a
+        failed on_complete leaves the upload incomplete at offset size, so
+        an empty chunk at that offset retries the completion.
+        """
+        meta = self._read_meta(upload_id)
+        if meta.get("path"):
+            raise UploadError("Upload already complete", 409, meta["size"])
+        part_path, meta_path = self._paths(upload_id)
+
+        with open(part_path, "ab") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError("Another chunk is being uploaded", 409) from None
+
+            # Completed by another request while this one was opening the file
+            meta = self._read_meta(upload_id)
+            if meta.get("path"):
+                if f.tell() == 0 and os.path.exists(part_path):
+                    os.remove(part_path)
+                raise UploadError("Upload already complete", 409, meta["size"])
+
+            current = f.seek(0, os.SEEK_END)
+            if offset != current:
+                raise UploadError("Offset does not match the uploaded size", 409, current)
+
+            remaining = meta["size"] - current
+            try:
+                while True:
+                    block = stream.read(COPY_BLOCK_BYTES)
+                    if not block:
+                        break
+                    if len(block) > remaining:
+                        # Back to where the chunk started, so it can be resent
+                        f.truncate(current)
+                        raise UploadError(
+                            "Chunk exceeds the declared upload size", 413, current
+                        )
+                    f.write(block)
+                    remaining -= len(block)
+            finally:
+                f.flush()
+            # Purging goes by the newest file of an upload; this also covers
+            # empty chunks that only retry the completion
+            os.utime(meta_path)
+
+            if remaining == 0:
+                path = os.path.join(
+                    os.path.dirname(self.directory), f"{upload_id}-{meta['filename']}"
+                )
+                os.replace(part_path, path)
+                meta["path"] = path
+                self._write_meta(upload_id, meta)
+                try:
+                    meta["jobId"] = on_complete(path)
+                except Exception:
+                    os.replace(path, part_path)
+                    meta["path"] = None
+                    self._write_meta(upload_id, meta)
+                    raise
+                self._write_meta(upload_id, meta)
+
+        return self.status(upload_id)
+
+    def delete(self, upload_id):
+        meta = self._read_meta(upload_id)
+        part_path, meta_path = self._paths(upload_id)
+        for path in (part_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return meta
+
+    def purge_expired(self):
+        """
+        Remove uploads, finished or not, that have been idle for longer than
+        expiry_seconds, with all their files. Runs at most once per
+        purge_interval.
+        """
+        now = time.time()
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+
+        uploads = {}
+        for name in os.listdir(self.directory):
+            upload_id = name.split(".", 1)[0]
+            uploads.setdefault(upload_id, []).append(os.path.join(self.directory, name))
+
+        for paths in uploads.values():
+            try:
+                if now - max(os.path.getmtime(path) for path in paths) <= self.expiry_seconds:
+                    continue
+                # Metadata first, so the upload is gone before its data is
+                for path in sorted(paths, key=lambda path: not path.endswith(".json")):
+                    os.remove(path)
+            except OSError:
+                # Removed concurrently by another worker
+                pass
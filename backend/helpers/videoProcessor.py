@@ -1,20 +1,14 @@
+import asyncio
 import os
-from moviepy import VideoFileClip
-import speech_recognition as sr
-from langchain_google_genai import ChatGoogleGenerativeAI
-from pydub import AudioSegment
-import tempfile
-from nltk.translate.bleu_score import sentence_bleu
-from rouge_score import rouge_scorer
-import nltk
-from googletrans import Translator
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-
-nltk.download('punkt')
-nltk.download('punkt_tab')
-nltk.download('wordnet')
-nltk.download('omw-1.4')
+import threading
+import weakref
+from helpers.translationCache import translation_cache
+from helpers.textChunker import split_into_chunks, join_chunks
+from helpers.audioStream import stream_speech_chunks
+from helpers.audioChunker import SilenceAwareChunker
+from helpers.speechBackends import get_speech_backend
+from helpers.multiTargetTranslator import MultiTargetTranslator
+from helpers import clients, telemetry
 
 class VideoTranscriptionTranslator:
     INDIAN_LANGUAGES = {
@@ -30,76 +24,146 @@ class VideoTranscriptionTranslator:
         "Odia": "or",
     }
 
-    def __init__(self, google_api_key):
+    GEMINI_MODEL = "gemini-2.0-flash-exp"
+    # Bump the prompt version whenever a translation prompt changes so that
+    # cached translations produced by the old prompt are not reused
+    PROMPT_VERSION = "v1"
+    GEMINI_CACHE_VERSION = f"{GEMINI_MODEL}/{PROMPT_VERSION}"
+    GOOGLE_TRANSLATE_MODEL = "googletrans"
+
+    # Maximum number of in-flight calls per provider
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "10"))
+    GOOGLE_TRANSLATE_MAX_CONCURRENCY = int(
+        os.getenv("GOOGLE_TRANSLATE_MAX_CONCURRENCY", "10")
+    )
+
+    # Texts longer than this are translated as parallel paragraph chunks
+    TRANSLATION_CHUNK_CHARS = int(os.getenv("TRANSLATION_CHUNK_CHARS", "2000"))
+    # Streamed translations of texts at least this long forward Gemini tokens
+    STREAM_MIN_CHARS = int(os.getenv("GEMINI_STREAM_MIN_CHARS", "1000"))
+    # "multi-target" asks Gemini for several languages in one structured
+    # response instead of sending the text once per language
+    PROMPT_MODES = ("per-language", "multi-target")
+    TRANSLATION_PROMPT_MODE = os.getenv("TRANSLATION_PROMPT_MODE", "per-language")
+
+    # How translations are evaluated: "full" back-translates them for BLEU
+    # and ROUGE and fetches a Google ground truth for the cosine similarity,
+    # "back-translation" skips the ground truth and "none" skips both
+    EVALUATION_PROFILES = ("none", "back-translation", "full")
+
+    # Speech chunks are cut at pauses within this length window
+    SPEECH_MIN_CHUNK_SECONDS = float(os.getenv("SPEECH_MIN_CHUNK_SECONDS", "10"))
+    SPEECH_MAX_CHUNK_SECONDS = float(os.getenv("SPEECH_MAX_CHUNK_SECONDS", "30"))
+    SPEECH_MIN_SILENCE_MS = int(os.getenv("SPEECH_MIN_SILENCE_MS", "400"))
+    SPEECH_SILENCE_THRESHOLD_DB = float(os.getenv("SPEECH_SILENCE_THRESHOLD_DB", "-40"))
+
+    def __init__(
+        self,
+        google_api_key,
+        gemini_concurrency=None,
+        google_translate_concurrency=None,
+        cache=None,
+        chunk_chars=None,
+        speech_backend=None,
+        prompt_mode=None,
+    ):
         """
         Initialize the translator with Google API key
         """
-        os.environ["GOOGLE_API_KEY"] = google_api_key
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", temperature=0)
-        self.recognizer = sr.Recognizer()
-        self.scorer = rouge_scorer.RougeScorer(
-            ["rouge1", "rouge2", "rougeL"], use_stemmer=True
+        self.gemini_concurrency = gemini_concurrency or self.GEMINI_MAX_CONCURRENCY
+        self.google_translate_concurrency = (
+            google_translate_concurrency or self.GOOGLE_TRANSLATE_MAX_CONCURRENCY
         )
-        self.google_translator = Translator()
-        self.vectorizer = TfidfVectorizer()
-
-    def extract_audio(self, video_path):
-        """
-        Extract audio from video file
-        """
-        print("Extracting audio from video...")
-        video = VideoFileClip(video_path)
-
-        temp_wav = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        video.audio.write_audiofile(temp_wav.name)
-        video.close()
-
-        return temp_wav.name
+        self._semaphores = weakref.WeakKeyDictionary()
+        self.cache = cache or translation_cache
+        self.chunk_chars = chunk_chars or self.TRANSLATION_CHUNK_CHARS
+        self.prompt_mode = prompt_mode or self.TRANSLATION_PROMPT_MODE
+        if self.prompt_mode not in self.PROMPT_MODES:
+            raise ValueError(f"Unknown translation prompt mode: {self.prompt_mode}")
+        if google_api_key:
+            os.environ["GOOGLE_API_KEY"] = google_api_key
+        # Provider clients come from the shared registry; assigning llm or
+        # google_translator overrides them for this instance only
+        self._llm = None
+        self._google_translator = None
+        self._semaphores_lock = threading.Lock()
+        self.speech_backend = speech_backend or get_speech_backend()
+        self.metrics_engine = clients.get_metrics_engine()
+
+    @property
+    def llm(self):
+        return self._llm or clients.get_llm(self.GEMINI_MODEL, temperature=0)
+
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
+
+    @property
+    def google_translator(self):
+        return self._google_translator or clients.get_google_translator()
+
+    @google_translator.setter
+    def google_translator(self, value):
+        self._google_translator = value
 
     def transcribe_audio(self, audio_path):
         """
-        Transcribe audio file to text
+        Transcribe the audio track of an audio or video file to text. The
+        audio is decoded through an ffmpeg pipe, split at pauses, and its
+        chunks are recognized in parallel from memory by the configured
+        speech backend, so no intermediate files are written.
         """
         print("Transcribing audio...")
-        audio = AudioSegment.from_wav(audio_path)
+        chunker = SilenceAwareChunker(
+            min_seconds=self.SPEECH_MIN_CHUNK_SECONDS,
+            max_seconds=self.SPEECH_MAX_CHUNK_SECONDS,
+            min_silence_ms=self.SPEECH_MIN_SILENCE_MS,
+            silence_threshold_db=self.SPEECH_SILENCE_THRESHOLD_DB,
+        )
+        with telemetry.span("transcribe_audio", backend=self.speech_backend.name):
+            return self.speech_backend.transcribe(stream_speech_chunks(audio_path, chunker))
 
-        chunk_length_ms = 30000  # 30 seconds
-        chunks = [
-            audio[i : i + chunk_length_ms]
-            for i in range(0, len(audio), chunk_length_ms)
-        ]
+    async def _translate_chunked(self, text, translate_chunk):
+        """
+        Split text longer than chunk_chars into chunks of whole paragraphs and
+        translate them in parallel. Each chunk is cached on its own, so re-translating an edited text only
+        calls the provider for the chunks that changed.
+        """
+        chunks = split_into_chunks(text, max_chars=self.chunk_chars)
+        if len(chunks) <= 1:
+            return await translate_chunk(text)
 
-        full_transcript = ""
-
-        for i, chunk in enumerate(chunks):
-            chunk_path = f"temp_chunk_{i}.wav"
-            chunk.export(chunk_path, format="wav")
-
-            with sr.AudioFile(chunk_path) as source:
-                audio_data = self.recognizer.record(source)
-                try:
-                    text = self.recognizer.recognize_google(audio_data)
-                    full_transcript += " " + text
-                except sr.UnknownValueError:
-                    print(f"Could not understand audio in chunk {i}")
-                except sr.RequestError as e:
-                    print(
-                        f"Could not request results from speech recognition service in chunk {i}; {e}"
-                    )
+        translated = await asyncio.gather(
+            *[translate_chunk(chunk) for chunk, _ in chunks]
+        )
+        return join_chunks(translated, chunks)
 
-            os.remove(chunk_path)
+    async def _google_translate_chunk(self, text, target_language_code):
+        async def fetch():
+            translation = await self._call(
+                "google_translate",
+                lambda: self.google_translator.translate(text, dest=target_language_code),
+            )
+            return translation.text
 
-        return full_transcript.strip()
+        return await self.cache.get_or_fetch(
+            text,
+            target_language_code,
+            "google_translate",
+            self.GOOGLE_TRANSLATE_MODEL,
+            fetch,
+        )
 
     async def get_google_translate_ground_truth(self, text, target_language_code):
         """
         Get ground truth translation using Google Translate
         """
         try:
-            translation = await self.google_translator.translate(
-                text, dest=target_language_code
-            )
-            return translation.text
+            with telemetry.span("ground_truth", language=target_language_code):
+                return await self._translate_chunked(
+                    text,
+                    lambda chunk: self._google_translate_chunk(chunk, target_language_code),
+                )
         except Exception as e:
             print(f"Error in Google Translate: {e}")
             return None
@@ -109,52 +173,152 @@ class VideoTranscriptionTranslator:
         Calculate cosine similarity between two texts using character-level n-grams
         for better handling of non-English text
         """
-        try:
-            # Convert texts to lowercase for better comparison
-            text1 = text1.lower()
-            text2 = text2.lower()
+        return self.metrics_engine.cosine_similarities([(text1, text2)])[0]
 
-            # Create character-level n-grams (3-grams) for better comparison of non-English text
-            vectorizer = TfidfVectorizer(analyzer="char", ngram_range=(3, 3))
+    def _translation_prompt(self, text, target_language):
+        return f"""
+        Translate the following text to {target_language}:
 
-            # Fit and transform the texts
-            tfidf_matrix = vectorizer.fit_transform([text1, text2])
+        {text}
 
-            # Calculate cosine similarity
-            similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-            return similarity
-        except Exception as e:
-            print(f"Error calculating cosine similarity: {e}")
-            return 0.0
+        Provide only the translation without any additional comments.
+        """
 
     def translate_text(self, text, target_language):
         """
         Translate text using Gemini
         """
         print(f"Translating text to {target_language}...")
-        prompt = f"""
-        Translate the following text to {target_language}:
 
-        {text}
+        def translate_chunk(chunk):
+            def fetch():
+                response = clients.get_provider_policy("gemini").call_sync(
+                    lambda: self.llm.invoke(self._translation_prompt(chunk, target_language))
+                )
+                telemetry.record_llm_usage(self.GEMINI_MODEL, response)
+                return response.content
 
-        Provide only the translation without any additional comments.
-        """
+            return self.cache.get_or_fetch_sync(
+                chunk, target_language, "gemini", self.GEMINI_CACHE_VERSION, fetch
+            )
 
-        response = self.llm.invoke(prompt)
-        return response.content
+        with telemetry.span("translate", language=target_language):
+            chunks = split_into_chunks(text, max_chars=self.chunk_chars)
+            if len(chunks) <= 1:
+                return translate_chunk(text)
+            return join_chunks([translate_chunk(chunk) for chunk, _ in chunks], chunks)
+
+    async def _gemini_translate_chunk(self, text, target_language):
+        async def fetch():
+            response = await self._call(
+                "gemini",
+                lambda: self.llm.ainvoke(self._translation_prompt(text, target_language)),
+            )
+            telemetry.record_llm_usage(self.GEMINI_MODEL, response)
+            return response.content
 
-    async def translate_to_english(self, text, source_language):
+        return await self.cache.get_or_fetch(
+            text, target_language, "gemini", self.GEMINI_CACHE_VERSION, fetch
+        )
+
+    async def _gemini_stream_chunk(self, text, target_language, emit):
         """
-        Translate text back to English for evaluation using Google Translate
+        Translate a chunk with Gemini token streaming, awaiting emit(piece)
+        for each piece of output as it arrives
         """
+        cached = await self.cache.get_async(
+            text, target_language, "gemini", self.GEMINI_CACHE_VERSION
+        )
+        if cached is not None:
+            await emit(cached)
+            return cached
+
+        pieces = []
+
+        async def stream():
+            async with self._semaphore("gemini"):
+                async for message in self.llm.astream(
+                    self._translation_prompt(text, target_language)
+                ):
+                    telemetry.record_llm_usage(self.GEMINI_MODEL, message)
+                    if message.content:
+                        pieces.append(message.content)
+                        await emit(message.content)
+
+        # Emitted pieces cannot be taken back, so only retry a stream that
+        # failed before its first piece
+        await clients.get_provider_policy("gemini").call(
+            stream, retry_if=lambda error: not pieces, hedge=False
+        )
+        translation = "".join(pieces)
+        await self.cache.set_async(
+            text, target_language, "gemini", self.GEMINI_CACHE_VERSION, translation
+        )
+        return translation
+
+    async def stream_translation(self, text, target_language, emit):
+        """
+        translate_text_async with Gemini token streaming. Chunks are still
+        translated in parallel, but their pieces are passed to emit in text
+        order; the returned translation is the authoritative text.
+        """
+        chunks = split_into_chunks(text, max_chars=self.chunk_chars)
+        if len(chunks) <= 1:
+            chunks = [(text, "")]
+
+        done = object()
+        queues = [asyncio.Queue() for _ in chunks]
+
+        async def translate_chunk(index, chunk):
+            try:
+                return await self._gemini_stream_chunk(
+                    chunk, target_language, queues[index].put
+                )
+            finally:
+                queues[index].put_nowait(done)
+
+        tasks = [
+            asyncio.create_task(translate_chunk(index, chunk))
+            for index, (chunk, _) in enumerate(chunks)
+        ]
         try:
-            translation = await self.google_translator.translate(
-                text, src=self.INDIAN_LANGUAGES[source_language], dest="en"
+            # Forward the head chunk live; later chunks are buffered until
+            # their turn
+            for index, (queue, (_, separator)) in enumerate(zip(queues, chunks)):
+                while (piece := await queue.get()) is not done:
+                    await emit(piece)
+                if index < len(chunks) - 1:
+                    await emit(separator)
+            translated = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if len(chunks) == 1:
+            return translated[0]
+        return join_chunks(translated, chunks)
+
+    async def translate_text_async(self, text, target_language):
+        """
+        Translate text using Gemini without blocking the event loop
+        """
+        print(f"Translating text to {target_language}...")
+        with telemetry.span("translate", language=target_language):
+            return await self._translate_chunked(
+                text, lambda chunk: self._gemini_translate_chunk(chunk, target_language)
+            )
+
+    async def _back_translate_chunk(self, text, source_language):
+        source_code = self.INDIAN_LANGUAGES[source_language]
+
+        async def fetch_google():
+            translation = await self._call(
+                "google_translate",
+                lambda: self.google_translator.translate(text, src=source_code, dest="en"),
             )
             return translation.text
-        except Exception as e:
-            print(f"Error in Google Translate (falling back to Gemini): {e}")
-            # Fallback to Gemini
+
+        async def fetch_gemini():
             prompt = f"""
             Translate the following {source_language} text to English:
 
@@ -162,9 +326,39 @@ class VideoTranscriptionTranslator:
 
             Provide only the translation without any additional comments.
             """
-            response = self.llm.invoke(prompt)
+            response = await self._call("gemini", lambda: self.llm.ainvoke(prompt))
+            telemetry.record_llm_usage(self.GEMINI_MODEL, response)
             return response.content
 
+        try:
+            return await self.cache.get_or_fetch(
+                text,
+                f"{source_code}>en",
+                "google_translate",
+                self.GOOGLE_TRANSLATE_MODEL,
+                fetch_google,
+            )
+        except Exception as e:
+            # Also taken right away while the Google Translate breaker is open
+            print(f"Error in Google Translate (falling back to Gemini): {e}")
+            # Fallback to Gemini
+            return await self.cache.get_or_fetch(
+                text,
+                f"{source_code}>en",
+                "gemini",
+                self.GEMINI_CACHE_VERSION,
+                fetch_gemini,
+            )
+
+    async def translate_to_english(self, text, source_language):
+        """
+        Translate text back to English for evaluation using Google Translate
+        """
+        with telemetry.span("back_translation", language=source_language):
+            return await self._translate_chunked(
+                text, lambda chunk: self._back_translate_chunk(chunk, source_language)
+            )
+
     async def calculate_metrics(
         self, original_text, translated_text, ground_truth_translation, language
     ):
@@ -174,124 +368,358 @@ class VideoTranscriptionTranslator:
         """
         # Translate back to English for comparison
         back_translation = await self.translate_to_english(translated_text, language)
+        with telemetry.span("metrics", languages=1):
+            [metrics] = await self.metrics_engine.score_async(
+                [
+                    {
+                        "original": original_text,
+                        "translated": translated_text,
+                        "ground_truth": ground_truth_translation,
+                        "back_translation": back_translation,
+                    }
+                ]
+            )
+        if metrics is None:
+            raise ValueError(f"Could not calculate metrics for {language}")
+        return metrics
 
-        # Tokenize texts for BLEU score
-        reference = nltk.word_tokenize(original_text.lower())
-        candidate = nltk.word_tokenize(back_translation.lower())
+    def _gemini_translations(self, transcript, languages):
+        """
+        Return {language: awaitable Gemini translation} for the transcript.
+        In multi-target mode the languages share prompts, which are sent when
+        the first translation is awaited.
+        """
+        if self.prompt_mode != "multi-target" or len(languages) < 2:
+            return {
+                language: self.translate_text_async(transcript, language)
+                for language in languages
+            }
+
+        shared = None
+
+        async def translation(language):
+            nonlocal shared
+            if shared is None:
+                print(f"Translating text to {len(languages)} languages in shared prompts...")
+                shared = asyncio.ensure_future(
+                    MultiTargetTranslator(self).translate(transcript, languages)
+                )
+            outcome = (await shared)[language]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
 
-        # Calculate BLEU score with smoothing
-        from nltk.translate.bleu_score import SmoothingFunction
+        return {language: translation(language) for language in languages}
 
-        smoothie = SmoothingFunction().method1
-        bleu_score = sentence_bleu(
-            [reference],
-            candidate,
-            weights=(0.25, 0.25, 0.25, 0.25),  # Equal weights for 1-4 grams
-            smoothing_function=smoothie,
-        )
+    async def _ground_truth(self, transcript, language, lang_code, evaluation):
+        """
+        Google ground truth for the cosine metric, or None unless the
+        evaluation profile is "full". If it cannot be fetched, e.g. while the
+        google_translate breaker is open, the language is still translated
+        and scored, with a None cosine similarity.
+        """
+        if evaluation != "full":
+            return None
+        ground_truth = await self.get_google_translate_ground_truth(transcript, lang_code)
+        if ground_truth is None:
+            print(f"Warning: No ground truth for {language}, scoring without it")
+        return ground_truth
 
-        # Calculate ROUGE scores
-        rouge_scores = self.scorer.score(original_text, back_translation)
+    async def _translate_language(
+        self, transcript, language, lang_code, translation=None, evaluation="full"
+    ):
+        """
+        Run the Gemini translation, Google ground truth and back-translation
+        for a single language
+        """
+        gemini_translation, ground_truth = await asyncio.gather(
+            translation or self.translate_text_async(transcript, language),
+            self._ground_truth(transcript, language, lang_code, evaluation),
+        )
 
-        # Calculate cosine similarity between translated texts
-        cosine_sim = self.calculate_cosine_similarity(
-            translated_text, ground_truth_translation
+        # Translate back to English for comparison
+        back_translation = await self.translate_to_english(
+            gemini_translation, language
         )
 
         return {
-            "bleu": bleu_score,
-            "rouge1": rouge_scores["rouge1"].fmeasure,
-            "rouge2": rouge_scores["rouge2"].fmeasure,
-            "rougeL": rouge_scores["rougeL"].fmeasure,
-            "cosine_similarity_with_ground_truth": cosine_sim,
+            "gemini_translation": gemini_translation,
+            "google_translation": ground_truth,
+            "back_translation": back_translation,
         }
 
-    async def process_video(self, video_path, required_languages):
+    def _semaphore(self, provider):
         """
-        Process video with improved error handling and progress reporting
+        The running loop's semaphore limiting in-flight calls to provider
         """
-        try:
-            # Extract audio
-            audio_path = self.extract_audio(video_path)
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            semaphores = self._semaphores.get(loop)
+            if semaphores is None:
+                # Semaphores are bound to the loop they are first used on
+                semaphores = {
+                    "gemini": asyncio.Semaphore(self.gemini_concurrency),
+                    "google_translate": asyncio.Semaphore(
+                        self.google_translate_concurrency
+                    ),
+                }
+                self._semaphores[loop] = semaphores
+        return semaphores[provider]
+
+    async def _limited(self, provider, coro):
+        """
+        Await a provider call under that provider's concurrency limit
+        """
+        async with self._semaphore(provider):
+            return await coro
+
+    async def _call(self, provider, factory):
+        """
+        Await factory() under the provider's concurrency limit and its
+        resilience policy: rate limit, retries, hedging and circuit breaker
+        """
+        return await clients.get_provider_policy(provider).call(
+            lambda: self._limited(provider, factory())
+        )
 
-            # Transcribe audio
-            transcript = self.transcribe_audio(audio_path)
+    async def translate_all_languages(self, transcript, required_languages, evaluation="full"):
+        """
+        Translate the transcript into every required language concurrently
+        and evaluate the translations with the given evaluation profile
+        ("full" or "back-translation"). A failure in one language is reported
+        and skipped without cancelling the others.
+        """
+        results = {"original_transcript": transcript, "translations": {}}
+        total_languages = len(required_languages)
+        print(f"\nProcessing {total_languages} languages concurrently...")
 
-            # Clean up temporary audio file
-            os.remove(audio_path)
+        languages = list(required_languages.items())
+        translations = self._gemini_translations(
+            transcript, [language for language, _ in languages]
+        )
+        outcomes = await asyncio.gather(
+            *[
+                self._translate_language(
+                    transcript, language, lang_code, translations[language], evaluation
+                )
+                for language, lang_code in languages
+            ],
+            return_exceptions=True,
+        )
 
-            results = {"original_transcript": transcript, "translations": {}}
+        translated = {}
+        for (language, _), outcome in zip(languages, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Warning: Skipping {language}: {outcome}")
+                continue
+            translated[language] = outcome
 
-            # Translate to all Indian languages and calculate metrics
-            print("yaha tak")
-            total_languages = len(required_languages)
-            for idx, (language, lang_code) in enumerate(required_languages.items(), 1):
-                print(f"\nProcessing {language} ({idx}/{total_languages})...")
+        for language, data in (await self._score_batch(transcript, translated)).items():
+            if data["metrics"] is None:
+                print(f"Warning: Skipping {language}: could not calculate metrics")
+                continue
+            results["translations"][language] = data
 
-                # Get Gemini translation
-                gemini_translation = self.translate_text(transcript, language)
+        return results
 
-                # Get Google Translate ground truth (awaited)
-                ground_truth = await self.get_google_translate_ground_truth(
-                    transcript, lang_code
-                )
+    async def _score_batch(self, transcript, translated):
+        """
+        Score every language in one batch off the event loop, replacing each
+        entry's back_translation with its metrics (None if scoring failed)
+        """
+        with telemetry.span("metrics", languages=len(translated)):
+            metrics = await self.metrics_engine.score_async(
+                [
+                    {
+                        "original": transcript,
+                        "translated": data["gemini_translation"],
+                        "ground_truth": data["google_translation"],
+                        "back_translation": data.pop("back_translation"),
+                    }
+                    for data in translated.values()
+                ]
+            )
+        for data, language_metrics in zip(translated.values(), metrics):
+            data["metrics"] = language_metrics
+        return translated
 
-                if ground_truth is None:
-                    print(
-                        f"Warning: Could not get ground truth translation for {language}"
-                    )
-                    continue
+    async def translate_languages_only(self, transcript, required_languages):
+        """
+        Translate the transcript into every required language concurrently
+        without evaluating the translations
+        """
+        results = {"original_transcript": transcript, "translations": {}}
+        languages = list(required_languages)
+        translations = self._gemini_translations(transcript, languages)
+        outcomes = await asyncio.gather(
+            *[translations[language] for language in languages],
+            return_exceptions=True,
+        )
 
-                # Calculate metrics
-                metrics = await self.calculate_metrics(
-                    transcript, gemini_translation, ground_truth, language
+        for language, outcome in zip(languages, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Warning: Skipping {language}: {outcome}")
+                continue
+            results["translations"][language] = {"gemini_translation": outcome}
+
+        return results
+
+    async def _evaluate_language(self, transcript, language, gemini_translation, evaluation):
+        ground_truth, back_translation = await asyncio.gather(
+            self._ground_truth(
+                transcript, language, self.INDIAN_LANGUAGES[language], evaluation
+            ),
+            self.translate_to_english(gemini_translation, language),
+        )
+
+        return {
+            "gemini_translation": gemini_translation,
+            "google_translation": ground_truth,
+            "back_translation": back_translation,
+        }
+
+    async def score_translations(self, transcript, translations, evaluation="full"):
+        """
+        Evaluate translations produced earlier, given as a dict of language to
+        Gemini translation, with the given evaluation profile. Languages that
+        cannot be evaluated get None metrics.
+        """
+        languages = list(translations)
+        outcomes = await asyncio.gather(
+            *[
+                self._evaluate_language(
+                    transcript, language, translations[language], evaluation
                 )
+                for language in languages
+            ],
+            return_exceptions=True,
+        )
 
-                results["translations"][language] = {
-                    "gemini_translation": gemini_translation,
-                    "google_translation": ground_truth,
-                    "metrics": metrics,
-                }
+        evaluated = {}
+        scored = {}
+        for language, outcome in zip(languages, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Warning: Could not evaluate {language}: {outcome}")
+                scored[language] = {"google_translation": None, "metrics": None}
+                continue
+            evaluated[language] = outcome
 
-            return results
+        scored.update(await self._score_batch(transcript, evaluated))
+        return scored
 
-        except Exception as e:
-            print(f"Error processing video: {str(e)}")
-            raise
+    async def stream_translations(self, transcript, required_languages, evaluation="full"):
+        """
+        Translate the transcript into every required language concurrently,
+        yielding events as they happen rather than when the slowest language
+        is done:
+
+        - "delta": a piece of Gemini output, for texts of at least
+          STREAM_MIN_CHARS characters (these are translated one prompt per
+          language, even in multi-target mode)
+        - "translation": a language's complete translation
+        - "metrics": its quality metrics and ground truth (None unless the
+          evaluation profile is "full"), unless the profile is "none"
+        - "error": the language failed and is skipped
+        """
+        events = asyncio.Queue()
+        finished = object()
+        stream = len(transcript) >= self.STREAM_MIN_CHARS
+        evaluate = evaluation != "none"
+        translations = (
+            {} if stream else self._gemini_translations(transcript, list(required_languages))
+        )
 
-    async def translate_text_transcript(self, required_languages, transcript):
-        try:
-            results = {"original_transcript": transcript, "translations": {}}
-            total_languages = len(required_languages)
-            for idx, (language, lang_code) in enumerate(required_languages.items(), 1):
-                print(f"\nProcessing {language} ({idx}/{total_languages})...")
+        async def run(language, lang_code):
+            ground_truth = None
+            try:
+                if evaluation == "full":
+                    ground_truth = asyncio.create_task(
+                        self.get_google_translate_ground_truth(transcript, lang_code)
+                    )
 
-                # Get Gemini translation
-                gemini_translation = self.translate_text(transcript, language)
+                if stream:
+                    async def emit(piece):
+                        await events.put({"event": "delta", "language": language, "text": piece})
 
-                # Get Google Translate ground truth (awaited)
-                ground_truth = await self.get_google_translate_ground_truth(
-                    transcript, lang_code
+                    with telemetry.span("translate", language=language, streamed=True):
+                        translation = await self.stream_translation(transcript, language, emit)
+                else:
+                    translation = await translations[language]
+                await events.put(
+                    {"event": "translation", "language": language, "translation": translation}
                 )
 
-                if ground_truth is None:
-                    print(
-                        f"Warning: Could not get ground truth translation for {language}"
+                if evaluate:
+                    back_translation = await self.translate_to_english(translation, language)
+                    google_translation = None
+                    if ground_truth is not None:
+                        google_translation = await ground_truth
+                        if google_translation is None:
+                            print(f"Warning: No ground truth for {language}, scoring without it")
+                    scored = await self._score_batch(
+                        transcript,
+                        {
+                            language: {
+                                "gemini_translation": translation,
+                                "google_translation": google_translation,
+                                "back_translation": back_translation,
+                            }
+                        },
+                    )
+                    if scored[language]["metrics"] is None:
+                        raise ValueError(f"Could not calculate metrics for {language}")
+                    await events.put(
+                        {
+                            "event": "metrics",
+                            "language": language,
+                            "metrics": scored[language]["metrics"],
+                            "google_translation": google_translation,
+                        }
                     )
+            except Exception as e:
+                print(f"Warning: Skipping {language}: {e}")
+                await events.put({"event": "error", "language": language, "message": str(e)})
+            finally:
+                if ground_truth is not None and not ground_truth.done():
+                    ground_truth.cancel()
+                await events.put(finished)
+
+        tasks = [
+            asyncio.create_task(run(language, lang_code))
+            for language, lang_code in required_languages.items()
+        ]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await events.get()
+                if event is finished:
+                    remaining -= 1
                     continue
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
 
-                # Calculate metrics
-                metrics = await self.calculate_metrics(
-                    transcript, gemini_translation, ground_truth, language
-                )
+    async def process_video(self, video_path, required_languages):
+        """
+        Process video with improved error handling and progress reporting
+        """
+        try:
+            # Stream the audio track straight from the video and transcribe it
+            transcript = self.transcribe_audio(video_path)
 
-                results["translations"][language] = {
-                    "gemini_translation": gemini_translation,
-                    "google_translation": ground_truth,
-                    "metrics": metrics,
-                }
+            # Translate to all Indian languages and calculate metrics
+            return await self.translate_all_languages(transcript, required_languages)
 
-            return results
+        except Exception as e:
+            print(f"Error processing video: {str(e)}")
+            raise
+
+    async def translate_text_transcript(self, required_languages, transcript, evaluation="full"):
+        try:
+            return await self.translate_all_languages(
+                transcript, required_languages, evaluation
+            )
         except Exception as e:
             print(f"Error processing video: {str(e)}")
             raise
@@ -0,0 +1,72 @@
+"""
+Create the blog_summary collection used by the paginated /fetchUserBlogs
+listing and backfill it from the existing blog documents.
+
+Usage: python migrate_blog_summaries.py
+
+Safe to re-run: summaries are upserted by (email, blog_id). Collections that
+already exist keep their indexing options; see "Blog Listing Indexes" in the
+README.
+"""
+import time
+
+from blog import make_snippet
+from db import get_db
+
+# Only the fields used in filters and sorts are indexed, so long blog bodies
+# never hit the Data API's indexed-string size limit or slow down writes
+COLLECTION_INDEXING = {
+    # url stays indexed for the public by-URL lookup
+    "blog": {"deny": ["blogtext"]},
+    "blog_summary": {"allow": ["email", "blog_id", "sourcelanguage", "createdat"]},
+}
+
+
+def ensure_collections(db):
+    existing = set(db.list_collection_names())
+    for name, indexing in COLLECTION_INDEXING.items():
+        if name in existing:
+            print(f"Collection {name} already exists, keeping its indexing options")
+            continue
+        db.create_collection(name, indexing=indexing)
+        print(f"Created collection {name} with indexing {indexing}")
+
+
+def backfill_summaries(db):
+    summaries = {}
+    for row in db["blog"].find(
+        {}, projection=["email", "blog_id", "blogtitle", "blogtext", "language", "labels"]
+    ):
+        key = (row.get("email"), row.get("blog_id"))
+        if key not in summaries:
+            summaries[key] = {
+                "blogtitle": row.get("blogtitle"),
+                "snippet": make_snippet(row.get("blogtext")),
+                "labels": row.get("labels"),
+                "sourcelanguage": row.get("language"),
+                "languages": [],
+            }
+        summaries[key]["languages"].append(row.get("language"))
+
+    # Existing blogs have no creation time; keep the order they were read in
+    now = time.time_ns() // 1000
+    summary = db["blog_summary"]
+    for offset, ((email, blog_id), fields) in enumerate(summaries.items()):
+        summary.update_one(
+            {"email": email, "blog_id": blog_id},
+            {"$set": fields, "$setOnInsert": {"createdat": now - offset}},
+            upsert=True,
+        )
+    print(f"Backfilled {len(summaries)} blog summaries")
+
+
+def main():
+    db = get_db()
+    if db is None:
+        raise SystemExit("AstraDB is not configured.")
+    ensure_collections(db)
+    backfill_summaries(db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+import os
+import uuid
+
+from helpers import eventLoop as event_loop
+from helpers.batchTranslator import BatchTranslator
+from helpers.jobQueue import NullJobContext
+from helpers.persistence import UnitOfWork, save, save_async
+
+
+def _metric_fields(metrics):
+    """
+    Map the translator's metrics dict to the translate collection fields
+    """
+    metrics = metrics or {}
+    return {
+        "bleuscore": metrics.get("bleu"),
+        "rouge1": metrics.get("rouge1"),
+        "rouge2": metrics.get("rouge2"),
+        "rougel": metrics.get("rougeL"),
+        "cosinesimilarity": metrics.get("cosine_similarity_with_ground_truth"),
+    }
+
+
+def _raw_input_row(rawInputId, content, email, is_video):
+    return {
+        "id": rawInputId,
+        "useremail": email,
+        "content": content,
+        "type": "video" if is_video else "text",
+    }
+
+
+def _metrics_status(score_mode, evaluation):
+    if evaluation == "none":
+        return "skipped"
+    return "pending" if score_mode == "deferred" else "done"
+
+
+def _translation_row(translateId, rawInputId, language, translation, fields, metrics_status):
+    return {
+        "id": translateId,
+        "inpid": rawInputId,
+        "lang": language,
+        "content": translation,
+        **fields,
+        "metricsstatus": metrics_status,
+    }
+
+
+def translate_and_store(db, translator, content, email, is_video, required_languages, **options):
+    """
+    Blocking translate_and_store_async, run on the shared event loop
+    """
+    return event_loop.run(
+        translate_and_store_async(
+            db, translator, content, email, is_video, required_languages, **options
+        )
+    )
+
+
+async def translate_and_store_async(
+    db,
+    translator,
+    content,
+    email,
+    is_video,
+    required_languages,
+    job=None,
+    score_mode="sync",
+    enqueue_scoring=None,
+    write_mode=None,
+    evaluation="full",
+):
+    """
+    Translate the content into the required languages, store the raw input
+    and translations, and return the /process-data response payload.
+
+    With score_mode "deferred" the translations are stored without metrics
+    and enqueue_scoring(payload) is called to score them in the background.
+    evaluation is the translator's evaluation profile; with "none" the
+    translations are stored without metrics and never scored. All rows are
+    written in one unit of work; with write_mode "write-behind" the response
+    does not wait for them.
+    """
+    job = job or NullJobContext()
+    deferred = score_mode == "deferred" and evaluation != "none"
+    metrics_status = _metrics_status(score_mode, evaluation)
+    final_resp = {}
+    rawInputId = str(uuid.uuid4())
+    unit = UnitOfWork(db)
+
+    with job.stage("translation"):
+        if deferred or evaluation == "none":
+            results = await translator.translate_languages_only(content, required_languages)
+        else:
+            results = await translator.translate_text_transcript(
+                required_languages, content, evaluation
+            )
+    final_resp["original_transcript"] = results["original_transcript"]
+
+    with job.stage("storage"):
+        unit.insert("raw_input", _raw_input_row(rawInputId, content, email, is_video))
+        allTranslationIds = []
+        pending = {}
+        for language, data in results["translations"].items():
+            print(f"\n{language}:")
+            translateId = str(uuid.uuid4())
+            fields = _metric_fields(data.get("metrics"))
+            final_resp[language] = [
+                data["gemini_translation"],
+                fields["bleuscore"],
+                fields["rouge1"],
+                fields["rouge2"],
+                fields["rougel"],
+                fields["cosinesimilarity"],
+            ]
+            unit.insert(
+                "translate",
+                _translation_row(
+                    translateId,
+                    rawInputId,
+                    language,
+                    data["gemini_translation"],
+                    fields,
+                    metrics_status,
+                ),
+            )
+            allTranslationIds.append(translateId)
+            pending[language] = {
+                "id": translateId,
+                "content": data["gemini_translation"],
+            }
+
+        if deferred and pending:
+            # Scoring updates the rows, so it is queued once they are written
+            payload = {
+                "rawInputId": rawInputId,
+                "content": content,
+                "translations": pending,
+                "evaluation": evaluation,
+            }
+            unit.on_commit(lambda: enqueue_scoring(payload))
+        await save_async(unit, write_mode)
+
+    return {
+        "data": final_resp,
+        "status": "success",
+        "rawInputId": rawInputId,
+        "translateId": allTranslationIds,
+        "metricsStatus": metrics_status,
+    }
+
+
+async def stream_translate_and_store(
+    db,
+    translator,
+    content,
+    email,
+    is_video,
+    required_languages,
+    score_mode="sync",
+    enqueue_scoring=None,
+    write_mode=None,
+    evaluation="full",
+):
+    """
+    Streaming translate_and_store_async: yields the translator's events as
+    each language is translated and scored, then stores the rows in one unit
+    of work and yields a final "stored" event with their ids.
+
+    As in translate_and_store_async, with score_mode "sync" languages whose
+    metrics could not be calculated are not stored.
+    """
+    deferred = score_mode == "deferred" and evaluation != "none"
+    metrics_status = _metrics_status(score_mode, evaluation)
+    translations = {}
+    metrics = {}
+
+    async for event in translator.stream_translations(
+        content, required_languages, evaluation="none" if deferred else evaluation
+    ):
+        if event["event"] == "translation":
+            translations[event["language"]] = event["translation"]
+        elif event["event"] == "metrics":
+            metrics[event["language"]] = event["metrics"]
+        yield event
+
+    rawInputId = str(uuid.uuid4())
+    unit = UnitOfWork(db)
+    unit.insert("raw_input", _raw_input_row(rawInputId, content, email, is_video))
+    translateIds = {}
+    pending = {}
+    for language, translation in translations.items():
+        if metrics_status == "done" and language not in metrics:
+            continue
+        translateId = str(uuid.uuid4())
+        unit.insert(
+            "translate",
+            _translation_row(
+                translateId,
+                rawInputId,
+                language,
+                translation,
+                _metric_fields(metrics.get(language)),
+                metrics_status,
+            ),
+        )
+        translateIds[language] = translateId
+        pending[language] = {"id": translateId, "content": translation}
+
+    if deferred and pending:
+        payload = {
+            "rawInputId": rawInputId,
+            "content": content,
+            "translations": pending,
+            "evaluation": evaluation,
+        }
+        unit.on_commit(lambda: enqueue_scoring(payload))
+    await save_async(unit, write_mode)
+
+    yield {
+        "event": "stored",
+        "status": "success",
+        "rawInputId": rawInputId,
+        "translateId": translateIds,
+        "metricsStatus": metrics_status,
+    }
+
+
+def score_and_store(db, translator, payload, job=None):
+    """
+    Compute the quality metrics of stored translations and fill them into
+    their translate rows
+    """
+    job = job or NullJobContext()
+    translations = payload["translations"]
+    unit = UnitOfWork(db)
+
+    with job.stage("evaluation"):
+        scored = event_loop.run(
+            translator.score_translations(
+                payload["content"],
+                {language: row["content"] for language, row in translations.items()},
+                # Jobs queued before evaluation profiles were fully evaluated
+                payload.get("evaluation", "full"),
+            )
+        )
+
+    with job.stage("storage"):
+        for language, data in scored.items():
+            unit.update(
+                "translate",
+                {"id": translations[language]["id"]},
+                {
+                    "$set": {
+                        **_metric_fields(data["metrics"]),
+                        "metricsstatus": "done" if data["metrics"] else "failed",
+                    }
+                },
+            )
+        unit.commit()
+
+    return {"rawInputId": payload["rawInputId"], "status": "success"}
+
+
+def transcribe_video_file(translator, video_path, job=None):
+    """
+    Transcribe a saved video by streaming its audio track, removing the video
+    afterwards
+    """
+    job = job or NullJobContext()
+    try:
+        with job.stage("transcription"):
+            transcript = translator.transcribe_audio(video_path)
+    finally:
+        # Clean up files
+        if os.path.exists(video_path):
+            os.remove(video_path)
+        else:
+            print(f"File {video_path} does not exist.")
+
+    return transcript
+
+
+def translate_batch_and_store(
+    db,
+    translator,
+    documents,
+    email,
+    required_languages,
+    store=True,
+    score=False,
+    enqueue_scoring=None,
+    write_batch_size=20,
+    write_mode=None,
+    evaluation="full",
+):
+    """
+    Translate many documents into the required languages, yielding one
+    result dict per document as soon as it completes. Rows are written in
+    units of work of write_batch_size documents. With score set, the rows
+    are scored in the background with the given evaluation profile.
+    """
+    batch_translator = BatchTranslator(translator)
+    score = score and evaluation != "none"
+    texts = [document["content"] for document in documents]
+    unit = UnitOfWork(db)
+    unit_documents = 0
+
+    def flush():
+        nonlocal unit, unit_documents
+        if unit_documents:
+            save(unit, write_mode)
+        unit = UnitOfWork(db)
+        unit_documents = 0
+
+    results = event_loop.iterate(
+        lambda: batch_translator.translate_documents(texts, list(required_languages))
+    )
+    # Results carry their row ids before their unit of work is saved, so
+    # the rows are saved even if the caller stops early or a document fails
+    try:
+        for index, translations, errors in results:
+            document = documents[index]
+            result = {
+                "id": document.get("id", index),
+                "translations": translations,
+                "errors": errors,
+            }
+
+            if store and translations:
+                rawInputId = str(uuid.uuid4())
+                unit.insert(
+                    "raw_input",
+                    {
+                        "id": rawInputId,
+                        "useremail": email,
+                        "content": document["content"],
+                        "type": "text",
+                    },
+                )
+                pending = {}
+                for language, content in translations.items():
+                    translateId = str(uuid.uuid4())
+                    unit.insert(
+                        "translate",
+                        {
+                            "id": translateId,
+                            "inpid": rawInputId,
+                            "lang": language,
+                            "content": content,
+                            **_metric_fields(None),
+                            "metricsstatus": "pending" if score else "skipped",
+                        },
+                    )
+                    pending[language] = {"id": translateId, "content": content}
+                if score and enqueue_scoring:
+                    payload = {
+                        "rawInputId": rawInputId,
+                        "content": document["content"],
+                        "translations": pending,
+                        "evaluation": evaluation,
+                    }
+                    unit.on_commit(lambda payload=payload: enqueue_scoring(payload))
+                result["rawInputId"] = rawInputId
+                result["translateIds"] = {
+                    language: row["id"] for language, row in pending.items()
+                }
+                unit_documents += 1
+                if unit_documents >= write_batch_size:
+                    flush()
+
+            yield result
+    finally:
+        if store:
+            flush()
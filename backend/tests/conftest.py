@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend modules the way app.py does, e.g. `from helpers import ...`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def translator():
+    """
+    Translator wired to zero-latency fake providers and an in-memory cache
+    """
+    from helpers.fakeProviders import FakeGoogleTranslator, FakeLLM, FakeSpeechBackend
+    from helpers.translationCache import TranslationCache
+    from helpers.videoProcessor import VideoTranscriptionTranslator
+
+    translator = VideoTranscriptionTranslator(
+        None, cache=TranslationCache(), speech_backend=FakeSpeechBackend("fixed:0")
+    )
+    translator.llm = FakeLLM("fixed:0")
+    translator.google_translator = FakeGoogleTranslator("fixed:0")
+    return translator
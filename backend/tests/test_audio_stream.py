@@ -0,0 +1,58 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from helpers import audioStream, telemetry
+
+
+def fake_ffmpeg(tmp_path, monkeypatch, script):
+    path = tmp_path / "ffmpeg"
+    path.write_text(f"#!{sys.executable}\nimport sys\n{script}\n")
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(audioStream, "get_ffmpeg_executable", lambda: str(path))
+
+
+@pytest.mark.skipif(os.name != "posix", reason="fake ffmpeg is a script")
+def test_verbose_ffmpeg_does_not_block_the_stream(tmp_path, monkeypatch):
+    # More error output than a pipe buffer holds, written before any audio
+    fake_ffmpeg(
+        tmp_path,
+        monkeypatch,
+        "sys.stderr.write('e' * 256 * 1024); sys.stderr.flush()\n"
+        "sys.stdout.buffer.write(bytes(64000))",
+    )
+
+    assert sum(len(block) for block in audioStream.stream_pcm("video.mp4")) == 64000
+
+
+@pytest.mark.skipif(os.name != "posix", reason="fake ffmpeg is a script")
+def test_ffmpeg_errors_are_raised(tmp_path, monkeypatch):
+    fake_ffmpeg(tmp_path, monkeypatch, "sys.stderr.write('moov atom not found'); sys.exit(1)")
+
+    with pytest.raises(RuntimeError, match="moov atom not found"):
+        list(audioStream.stream_pcm("video.mp4"))
+
+
+@pytest.mark.skipif(os.name != "posix", reason="fake ffmpeg is a script")
+def test_decode_is_recorded_as_one_extract_audio_span(tmp_path, monkeypatch):
+    fake_ffmpeg(
+        tmp_path,
+        monkeypatch,
+        "import time\ntime.sleep(0.1)\nsys.stdout.buffer.write(bytes(64000))",
+    )
+
+    with telemetry.traced("test") as trace:
+        with telemetry.span("transcribe_audio"):
+            for _ in audioStream.stream_pcm("video.mp4"):
+                # Work done between blocks is not part of the decode
+                with telemetry.span("recognize"):
+                    pass
+
+    spans = {span["name"]: span for span in trace.spans}
+    extract_audio = spans["extract_audio"]
+    assert [span["name"] for span in trace.spans].count("extract_audio") == 1
+    assert extract_audio["parent"] == spans["transcribe_audio"]["id"]
+    assert spans["recognize"]["parent"] == spans["transcribe_audio"]["id"]
+    assert extract_audio["attributes"]["waiting_seconds"] >= 0.1
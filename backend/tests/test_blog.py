@@ -0,0 +1,81 @@
+import pytest
+from flask import Flask
+
+import blog
+from helpers.blogCache import BlogCache
+from helpers.fakeProviders import FakeDatabase
+
+app = Flask(__name__)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase("fixed:0")
+    monkeypatch.setattr(blog, "db", db)
+    monkeypatch.setattr(blog, "blog_cache", BlogCache())
+    return db
+
+
+def post(handler, **data):
+    with app.test_request_context(method="POST", json=data):
+        return handler(blog.request)
+
+
+def by_url(url):
+    with app.test_request_context(f"/blogs/{url}"):
+        response = blog.get_blog_by_url(blog.request, url)
+    return response if isinstance(response, tuple) else (response, response.status_code)
+
+
+def save(handler, title, text="Some text."):
+    return post(
+        handler,
+        email="a@b.c",
+        blog_id="b1",
+        blogTitle=title,
+        blogText=text,
+        publish=True,
+        language="English",
+    )
+
+
+def test_update_moves_the_blog_to_its_new_url(db):
+    save(blog.insert_blog, "Old Title")
+    assert by_url("old-title")[1] == 200
+
+    save(blog.update_blog, "New Title")
+
+    assert db["blog"].find_one({"blog_id": "b1"})["url"] == "new-title"
+    response, status = by_url("new-title")
+    assert status == 200 and response.json["blogtitle"] == "New Title"
+    assert by_url("old-title")[1] == 404
+
+
+def test_update_invalidates_another_blog_cached_under_the_new_url(db):
+    db["blog"].insert_one(
+        {"email": "x@y.z", "blog_id": "b0", "url": "new-title", "blogtitle": "Other",
+         "publish": True, "language": "English"}
+    )
+    save(blog.insert_blog, "Old Title")
+    assert by_url("new-title")[0].json["blog_id"] == "b0"
+
+    # The other blog moves away; this one takes its slug
+    db["blog"].update_one({"blog_id": "b0"}, {"$set": {"url": "other"}})
+    save(blog.update_blog, "New Title")
+
+    assert by_url("new-title")[0].json["blog_id"] == "b1"
+
+
+def test_author_reads_bypass_a_process_local_cache(db):
+    save(blog.insert_blog, "Title", "First draft.")
+
+    def get_text():
+        return post(
+            blog.get_blog, email="a@b.c", blog_id="b1", language="English"
+        ).json["blogtext"]
+
+    assert get_text() == "First draft."
+    # An edit through another worker, whose invalidation this one cannot see
+    db["blog"].update_one({"blog_id": "b1"}, {"$set": {"blogtext": "Second draft."}})
+
+    assert get_text() == "Second draft."
@@ -0,0 +1,68 @@
+import uuid
+
+from astrapy.exceptions import DataAPIErrorDescriptor, DataAPIResponseException
+
+from helpers.persistence import UnitOfWork, WriteBehindWriter
+
+
+class FlakyCollection:
+    """
+    Collection whose first insert_many stores every row and then times out,
+    and which rejects rows whose _id is already stored, like the Data API
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.inserts = 0
+
+    def to_async(self):
+        return self
+
+    async def insert_many(self, documents):
+        self.inserts += 1
+        duplicates = []
+        for document in documents:
+            _id = document.get("_id") or str(uuid.uuid4())
+            if _id in self.documents:
+                duplicates.append(
+                    DataAPIErrorDescriptor(
+                        {"errorCode": "DOCUMENT_ALREADY_EXISTS", "message": f"{_id} exists"}
+                    )
+                )
+            else:
+                self.documents[_id] = document
+        if self.inserts == 1:
+            raise TimeoutError("Response lost after the insert landed")
+        if duplicates:
+            raise DataAPIResponseException(
+                "Some documents could not be inserted",
+                error_descriptors=duplicates,
+                detailed_error_descriptors=[],
+            )
+
+
+class FlakyDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FlakyCollection())
+
+
+def test_write_behind_retry_does_not_insert_rows_twice():
+    db = FlakyDatabase()
+    committed = []
+    unit = UnitOfWork(db)
+    unit.insert("translate", {"id": "t1", "lang": "Hindi"})
+    unit.insert("translate", {"id": "t2", "lang": "Tamil"})
+    unit.on_commit(lambda: committed.append(True))
+
+    writer = WriteBehindWriter(max_retries=2, backoff_seconds=0)
+    writer.submit(unit)
+    assert writer.flush(timeout=10)
+
+    collection = db["translate"]
+    assert collection.inserts == 2
+    assert sorted(collection.documents) == ["t1", "t2"]
+    # The retry only found rows already stored, which counts as written
+    assert committed == [True]
@@ -0,0 +1,211 @@
+import asyncio
+import time
+
+import pytest
+
+from helpers import clients
+from helpers.fakeProviders import FakeLLM
+from helpers.resilience import CircuitBreaker, CircuitOpenError, ProviderPolicy, TokenBucket
+
+PROMPT = "Translate the following text to Hindi:\n\nHello there.\n\nProvide only the translation."
+
+
+class DroppingStreamLLM(FakeLLM):
+    """
+    FakeLLM whose nth stream fails after drops[n] pieces, or completes once
+    drops runs out
+    """
+
+    def __init__(self, drops, latency="fixed:0"):
+        super().__init__(latency)
+        self.drops = list(drops)
+
+    async def astream(self, prompt, pieces=8):
+        drop_after = self.drops.pop(0) if self.drops else None
+        sent = 0
+        async for message in super().astream(prompt, pieces):
+            if sent == drop_after:
+                raise RuntimeError("Simulated dropped stream")
+            sent += 1
+            yield message
+
+
+def test_bucket_reservations_are_paced_at_its_rate():
+    bucket = TokenBucket(rate=10, burst=2)
+    waits = [bucket.reserve() for _ in range(5)]
+
+    # The burst is served at once, then callers queue 1 / rate apart
+    assert waits == pytest.approx([0.0, 0.0, 0.1, 0.2, 0.3], abs=0.01)
+    assert TokenBucket(rate=0).reserve() == 0.0
+
+
+def test_policy_paces_provider_calls():
+    llm = FakeLLM("fixed:0")
+    policy = ProviderPolicy("gemini", rate=20, burst=1)
+
+    async def main():
+        await asyncio.gather(*[policy.call(lambda: llm.ainvoke(PROMPT)) for _ in range(5)])
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - started
+
+    assert llm.calls == 5
+    # One call right away, then one every 50 ms
+    assert 0.18 <= elapsed < 0.5
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.1)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.12)
+    assert breaker.state == "half-open"
+    # Only a single trial call is let through
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # A failed trial opens the breaker again
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.12)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_policy_short_circuits_an_open_breaker():
+    llm = FakeLLM("fixed:0", error_rate=1.0)
+    policy = ProviderPolicy("gemini", max_retries=0, failure_threshold=2, reset_seconds=0.1)
+
+    async def call():
+        return await policy.call(lambda: llm.ainvoke(PROMPT))
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            asyncio.run(call())
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call())
+    assert llm.calls == 2
+    assert policy.stats()["short_circuits"] == 1
+
+    llm.error_rate = 0.0
+    time.sleep(0.12)
+    assert asyncio.run(call()).content == "[Hindi] Hello there."
+    assert policy.stats()["breaker"] == "closed"
+
+
+def test_hedge_cancels_the_losing_request():
+    policy = ProviderPolicy("gemini", max_retries=0, hedge_after_seconds=0.05)
+    slow, fast = FakeLLM("fixed:2000"), FakeLLM("fixed:0")
+    llms = iter([slow, fast])
+    cancelled = []
+
+    async def request(llm):
+        try:
+            return await llm.ainvoke(PROMPT)
+        except asyncio.CancelledError:
+            cancelled.append(llm)
+            raise
+
+    async def main():
+        result = await policy.call(lambda: request(next(llms)))
+        # Let the cancellation of the loser run, before asyncio.run would
+        # cancel whatever is left
+        await asyncio.sleep(0)
+        return result, list(cancelled)
+
+    started = time.perf_counter()
+    result, cancelled_in_call = asyncio.run(main())
+
+    assert result.content == "[Hindi] Hello there."
+    assert time.perf_counter() - started < 1
+    assert cancelled_in_call == [slow]
+    stats = policy.stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_hedge_is_not_sent_for_fast_calls():
+    llm = FakeLLM("fixed:0")
+    policy = ProviderPolicy("gemini", hedge_after_seconds=0.5)
+
+    asyncio.run(policy.call(lambda: llm.ainvoke(PROMPT)))
+
+    assert llm.calls == 1
+    assert policy.stats()["hedges"] == 0
+
+
+@pytest.fixture
+def stream_translator(translator):
+    policy = ProviderPolicy("gemini", max_retries=2, backoff_seconds=0)
+    clients.register(("policy", "gemini"), policy)
+    yield translator, policy
+    clients.unregister(("policy", "gemini"))
+
+
+def stream_chunk(translator, text):
+    emitted = []
+
+    async def emit(piece):
+        emitted.append(piece)
+
+    async def main():
+        return await translator._gemini_stream_chunk(text, "Hindi", emit)
+
+    return asyncio.run(main()), emitted
+
+
+def test_stream_is_retried_before_its_first_piece(stream_translator):
+    translator, policy = stream_translator
+    translator.llm = DroppingStreamLLM(drops=[0])
+
+    translation, emitted = stream_chunk(translator, "Hello there.")
+
+    assert translation == "[Hindi] Hello there."
+    assert "".join(emitted) == translation
+    assert translator.llm.calls == 2
+    assert policy.stats()["retries"] == 1
+
+
+def test_stream_is_not_retried_after_its_first_piece(stream_translator):
+    translator, policy = stream_translator
+    translator.llm = DroppingStreamLLM(drops=[2])
+
+    with pytest.raises(RuntimeError, match="dropped stream"):
+        stream_chunk(translator, "Hello there, a stream that drops midway.")
+
+    # Pieces already emitted cannot be taken back, so the stream is not repeated
+    assert translator.llm.calls == 1
+    assert policy.stats()["retries"] == 0
+
+
+def test_languages_are_kept_while_the_google_breaker_is_open(translator):
+    policy = ProviderPolicy("google_translate", max_retries=0, failure_threshold=1)
+    clients.register(("policy", "google_translate"), policy)
+    translator.google_translator.error_rate = 1.0
+    try:
+        # Open the breaker, so ground truths are short-circuited
+        with pytest.raises(RuntimeError):
+            asyncio.run(policy.call(lambda: translator.google_translator.translate("x", "hi")))
+        assert policy.stats()["breaker"] == "open"
+
+        results = asyncio.run(
+            translator.translate_text_transcript(
+                {"Hindi": "hi", "Tamil": "ta"}, "Hello there.", "full"
+            )
+        )
+    finally:
+        clients.unregister(("policy", "google_translate"))
+
+    assert set(results["translations"]) == {"Hindi", "Tamil"}
+    hindi = results["translations"]["Hindi"]
+    assert hindi["gemini_translation"] == "[Hindi] Hello there."
+    assert hindi["google_translation"] is None
+    assert hindi["metrics"]["cosine_similarity_with_ground_truth"] is None
+    assert hindi["metrics"]["bleu"] is not None
+    assert policy.stats()["short_circuits"] >= 2
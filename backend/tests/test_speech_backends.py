@@ -0,0 +1,66 @@
+import os
+
+import speech_recognition as sr
+
+from helpers.parallelRecognizer import UNINTELLIGIBLE_MARKER
+from helpers.speechBackends import LocalSpeechBackend, _build_backend
+
+
+class StubEngine:
+    """
+    Offline stand-in for a CPU speech engine: "recognizes" a chunk as its
+    bytes, tagged with the process that loaded it
+    """
+
+    name = "stub"
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.pid = os.getpid()
+
+    def recognize(self, frame_data, sample_rate):
+        text = frame_data.decode()
+        return f"{self.prefix}{text}@{self.pid}" if text.strip() else ""
+
+
+def make_chunks(texts):
+    return [sr.AudioData(text.encode(), 16000, 2) for text in texts]
+
+
+def test_local_backend_is_named_after_its_engine(monkeypatch):
+    monkeypatch.setenv("VOSK_MODEL_PATH", "/models/vosk")
+
+    # The engines load their models in the pool processes, so building the
+    # backends needs neither the models nor the engine packages
+    assert _build_backend("vosk").name == "vosk"
+    assert _build_backend("faster-whisper").name == "faster-whisper"
+    assert LocalSpeechBackend(StubEngine, {"prefix": ""}).name == "stub"
+
+
+def test_local_backend_transcribes_in_order_across_the_pool():
+    backend = LocalSpeechBackend(StubEngine, {"prefix": "#"}, processes=2, batch_size=2)
+    # More batches than the pool keeps in flight, with blank chunks between
+    texts = [f"w{index}" if index % 5 else " " for index in range(1, 21)]
+    try:
+        transcript = backend.transcribe(make_chunks(texts))
+    finally:
+        backend.shutdown()
+
+    words = transcript.split(" ")
+    assert [word.split("@")[0] for word in words] == [
+        f"#{text}" if text.strip() else UNINTELLIGIBLE_MARKER for text in texts
+    ]
+    pids = {word.split("@")[1] for word in words if "@" in word}
+    # The engine ran in the pool processes, never in the caller
+    assert pids and str(os.getpid()) not in pids
+    assert len(pids) <= 2
+
+
+def test_local_backend_restarts_its_pool_after_shutdown():
+    backend = LocalSpeechBackend(StubEngine, {"prefix": ""}, processes=1, batch_size=4)
+    try:
+        assert backend.transcribe(make_chunks(["a"])).startswith("a@")
+        backend.shutdown()
+        assert backend.transcribe(make_chunks(["b"])).startswith("b@")
+    finally:
+        backend.shutdown()
@@ -0,0 +1,50 @@
+import asyncio
+
+from helpers.textChunker import join_chunks, split_into_chunks
+
+
+def paragraphs(count, words):
+    return "\n\n".join(f"Paragraph {index}." + " word" * words for index in range(count))
+
+
+def test_text_within_the_limit_is_one_chunk():
+    text = paragraphs(3, 50)
+    assert 200 < len(text) <= 2000
+
+    assert split_into_chunks(text, max_chars=2000) == [(text, "")]
+
+
+def test_long_text_packs_adjacent_paragraphs():
+    text = paragraphs(10, 150)
+    chunks = split_into_chunks(text, max_chars=2000)
+
+    # Each 755 character paragraph fits twice in a chunk, never three times
+    assert [chunk.count("Paragraph") for chunk, _ in chunks] == [2, 2, 2, 2, 2]
+    assert all(len(chunk) <= 2000 for chunk, _ in chunks)
+    assert join_chunks([chunk for chunk, _ in chunks], chunks) == text
+
+
+def test_long_paragraph_is_split_at_sentences():
+    text = "A short sentence here. " * 200
+    chunks = split_into_chunks(text, max_chars=2000)
+
+    assert len(chunks) == 3
+    assert all(len(chunk) <= 2000 and chunk.endswith(".") for chunk, _ in chunks)
+    assert [separator for _, separator in chunks] == [" ", " ", "\n\n"]
+
+
+def test_short_multi_paragraph_text_makes_one_call_per_provider(translator):
+    text = paragraphs(3, 50)
+
+    async def main():
+        return await asyncio.gather(
+            translator.translate_text_async(text, "Hindi"),
+            translator.get_google_translate_ground_truth(text, "hi"),
+        )
+
+    gemini, google = asyncio.run(main())
+
+    assert gemini == f"[Hindi] {text}"
+    assert google == f"[hi] {text}"
+    assert translator.llm.calls == 1
+    assert translator.google_translator.calls == 1
@@ -0,0 +1,54 @@
+import io
+import os
+import time
+
+import pytest
+
+from helpers.uploadStore import UploadError, UploadStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path / "uploads"), max_bytes=100, expiry_seconds=60, purge_interval=0)
+
+
+def age(store, upload_id, seconds):
+    for suffix in (".part", ".json"):
+        path = os.path.join(store.directory, upload_id + suffix)
+        if os.path.exists(path):
+            past = time.time() - seconds
+            os.utime(path, (past, past))
+
+
+def test_uploads_still_receiving_chunks_are_kept(store):
+    upload_id = store.create("video.mp4", 10)
+    store.append(upload_id, 0, io.BytesIO(b"abcd"), lambda path: None)
+    age(store, upload_id, 3600)
+
+    # A chunk after the upload was created long ago keeps it alive
+    store.append(upload_id, 4, io.BytesIO(b"ef"), lambda path: None)
+    store.purge_expired()
+
+    assert store.status(upload_id)["offset"] == 6
+
+
+def test_idle_uploads_are_purged_with_all_their_files(store):
+    upload_id = store.create("video.mp4", 10)
+    store.append(upload_id, 0, io.BytesIO(b"abcd"), lambda path: None)
+    age(store, upload_id, 3600)
+
+    store.purge_expired()
+
+    with pytest.raises(UploadError):
+        store.status(upload_id)
+    assert os.listdir(store.directory) == []
+
+
+def test_orphaned_part_files_are_purged(store):
+    upload_id = store.create("video.mp4", 10)
+    os.remove(os.path.join(store.directory, f"{upload_id}.json"))
+    age(store, upload_id, 3600)
+
+    store.purge_expired()
+
+    assert os.listdir(store.directory) == []
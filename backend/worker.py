@@ -0,0 +1,17 @@
+import os
+import time
+
+# Compute-only process: do not start the web process' embedded workers
+os.environ["JOB_EMBEDDED_WORKERS"] = "0"
+
+from app import job_queue
+
+if __name__ == "__main__":
+    count = int(os.getenv("JOB_WORKERS", "4"))
+    print(f"Starting {count} job workers...")
+    job_queue.start_workers(count)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        job_queue.stop()